@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+unittest和pytest(包括pytest-xdist)的集成，把测试结果记录为和json文件相同格式的记录
+
+记录先缓存在内存中，成批的写出到:
+    JsonLinesResultWriter    每个进程(xdist的每个worker)一个jsonl文件，之后用 --datadir 指向所在目录生成报告
+    SocketResultWriter       发送给以 --collect 方式启动的收集进程
+    CollectorResultWriter    同一个进程中的TestResultCollector
+
+unittest:
+    m_Result = HtmlTestReportResult(JsonLinesResultWriter("results/unittest.jsonl"))
+    m_TestSuite.run(m_Result)
+    m_Result.stopTestRun()
+
+pytest:
+    pytest -p HtmlTestReport.integrations --htmltestreport-dir results -n 64
+Case的所有人用 @pytest.mark.owner("name") 或者 @owner("name") 标记
+"""
+import os
+import json
+import socket
+import unittest
+import datetime
+from time import time, perf_counter
+
+
+def owner(p_CaseOwner):
+    """
+    标记unittest的测试方法或测试类的所有人
+    """
+    def decorator(p_Object):
+        p_Object.htmltestreport_owner = p_CaseOwner
+        return p_Object
+    return decorator
+
+
+def MakeTestResultRecord(p_SuiteName, p_CaseName, p_CaseStatus, p_StartTime, p_ElapsedTime,
+                         p_CaseOwner=None, p_ErrorStackTrace=""):
+    """
+    生成一条测试结果记录，p_StartTime是时间戳(秒)，p_ElapsedTime是运行的秒数
+    """
+    m_TestResult = {
+        "SuiteName": p_SuiteName,
+        "CaseName": p_CaseName,
+        "CaseStatus": p_CaseStatus,
+        "CaseStartTime": datetime.datetime.fromtimestamp(p_StartTime).strftime("%Y-%m-%d %H:%M:%S"),
+        # 报告中的运行时间按整秒计算
+        "CaseElapsedTime": str(int(round(p_ElapsedTime))),
+        "CaseErrorStackTrace": p_ErrorStackTrace,
+        "CaseReportLink": "",
+        "DownloadURLLink": "",
+    }
+    if p_CaseOwner is not None:
+        m_TestResult["CaseOwner"] = p_CaseOwner
+    return m_TestResult
+
+
+class _BufferedResultWriter(object):
+    """
+    缓存测试结果记录，达到一定数量后成批写出，一个写出器只能在一个线程中使用
+    """
+
+    # 默认缓存的记录数
+    DEFAULT_BUFFER_SIZE = 256
+
+    def __init__(self, p_BufferSize=DEFAULT_BUFFER_SIZE):
+        self.BufferSize = p_BufferSize
+        self.Buffer = []
+
+    def write(self, p_TestResult):
+        self.Buffer.append(p_TestResult)
+        if len(self.Buffer) >= self.BufferSize:
+            self.flush()
+
+    def flush(self):
+        if len(self.Buffer) == 0:
+            return
+        m_TestResults = self.Buffer
+        self.Buffer = []
+        self._write_records(m_TestResults)
+
+    def close(self):
+        self.flush()
+
+    def _write_records(self, p_TestResults):
+        raise NotImplementedError
+
+
+class JsonLinesResultWriter(_BufferedResultWriter):
+    def __init__(self, p_FileName, p_BufferSize=_BufferedResultWriter.DEFAULT_BUFFER_SIZE):
+        super().__init__(p_BufferSize)
+        self.FileName = p_FileName
+        self.FileHandler = None
+
+    def _write_records(self, p_TestResults):
+        if self.FileHandler is None:
+            if os.path.dirname(self.FileName) != "":
+                os.makedirs(os.path.dirname(self.FileName), exist_ok=True)
+            self.FileHandler = open(self.FileName, "w")
+        # 一次写出一批完整的行，进程中断时最多丢失最后一行
+        self.FileHandler.write("".join([json.dumps(m_TestResult) + "\n" for m_TestResult in p_TestResults]))
+        self.FileHandler.flush()
+
+    def close(self):
+        super().close()
+        if self.FileHandler is not None:
+            self.FileHandler.close()
+            self.FileHandler = None
+
+
+class SocketResultWriter(_BufferedResultWriter):
+    def __init__(self, p_Address, p_BufferSize=_BufferedResultWriter.DEFAULT_BUFFER_SIZE):
+        super().__init__(p_BufferSize)
+        self.Address = p_Address
+        self.Socket = None
+
+    def _connect(self):
+        # 地址格式和 --collect 相同: unix:PATH 或者 [HOST:]PORT
+        if self.Address.startswith("unix:"):
+            m_Socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            m_Socket.connect(self.Address[len("unix:"):])
+            return m_Socket
+        m_Host, _, m_Port = self.Address.rpartition(":")
+        return socket.create_connection((m_Host or "127.0.0.1", int(m_Port)))
+
+    def _write_records(self, p_TestResults):
+        if self.Socket is None:
+            self.Socket = self._connect()
+        self.Socket.sendall("".join([json.dumps(m_TestResult) + "\n" for m_TestResult in p_TestResults])
+                            .encode("utf-8"))
+
+    def close(self):
+        super().close()
+        if self.Socket is not None:
+            self.Socket.close()
+            self.Socket = None
+
+
+class CollectorResultWriter(_BufferedResultWriter):
+    def __init__(self, p_Collector, p_BufferSize=_BufferedResultWriter.DEFAULT_BUFFER_SIZE):
+        super().__init__(p_BufferSize)
+        self.Collector = p_Collector
+
+    def _write_records(self, p_TestResults):
+        for m_TestResult in p_TestResults:
+            m_TestResult["load_filename"] = "in-process"
+        self.Collector.addTestResults(p_TestResults)
+
+
+class HtmlTestReportResult(unittest.TestResult):
+    """
+    unittest的TestResult，每个测试结束时把结果记录写到p_Writer中
+    跳过的测试不记录，预期的失败记为成功，意外的成功记为失败
+    """
+
+    def __init__(self, p_Writer, stream=None, descriptions=None, verbosity=None):
+        super().__init__(stream, descriptions, verbosity)
+        self.Writer = p_Writer
+        self.CaseStartTime = None
+        self.CaseStartCounter = None
+        self.CaseStatus = None
+        self.CaseTraceContent = []
+
+    @staticmethod
+    def _get_case_owner(p_Test):
+        m_TestMethod = getattr(p_Test, getattr(p_Test, "_testMethodName", ""), None)
+        for m_Object in (m_TestMethod, p_Test):
+            m_CaseOwner = getattr(m_Object, "htmltestreport_owner", None)
+            if m_CaseOwner is not None:
+                return m_CaseOwner
+        return None
+
+    @staticmethod
+    def _get_case_name(p_Test):
+        if not isinstance(p_Test, unittest.TestCase):
+            # setUpClass/setUpModule失败时unittest给出的占位对象
+            return "unittest", str(p_Test)
+        # Suite为测试类的全名，Case为测试方法名
+        m_SuiteName, _, m_CaseName = p_Test.id().rpartition(".")
+        return m_SuiteName or type(p_Test).__module__, m_CaseName
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.CaseStartTime = time()
+        self.CaseStartCounter = perf_counter()
+        self.CaseStatus = "SUCCESS"
+        self.CaseTraceContent = []
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        if self.CaseStatus is None:
+            return
+        m_SuiteName, m_CaseName = self._get_case_name(test)
+        self.Writer.write(MakeTestResultRecord(
+            m_SuiteName, m_CaseName, self.CaseStatus, self.CaseStartTime, perf_counter() - self.CaseStartCounter,
+            self._get_case_owner(test), "\n".join(self.CaseTraceContent)))
+        self.CaseStatus = None
+
+    def stopTestRun(self):
+        super().stopTestRun()
+        self.Writer.close()
+
+    def _set_case_status(self, p_Test, p_CaseStatus, p_Error):
+        if self.CaseStatus is None:
+            # setUpClass/setUpModule之类不属于任何测试的错误，单独记录一条
+            m_SuiteName, m_CaseName = self._get_case_name(p_Test)
+            self.Writer.write(MakeTestResultRecord(
+                m_SuiteName, m_CaseName, p_CaseStatus, time(), 0, None, self._exc_info_to_string(p_Error, p_Test)))
+            return
+        # 错误优先于失败
+        if self.CaseStatus != "ERROR":
+            self.CaseStatus = p_CaseStatus
+        if p_Error is not None:
+            self.CaseTraceContent.append(self._exc_info_to_string(p_Error, p_Test))
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._set_case_status(test, "ERROR", err)
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._set_case_status(test, "FAILURE", err)
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is None:
+            return
+        if issubclass(err[0], test.failureException):
+            self._set_case_status(test, "FAILURE", err)
+        else:
+            self._set_case_status(test, "ERROR", err)
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.CaseStatus = None
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._set_case_status(test, "FAILURE", None)
+
+
+class HtmlTestReportPlugin(object):
+    """
+    pytest插件，汇总每个测试setup/call/teardown三个阶段的报告，teardown结束时写出一条记录
+    """
+
+    def __init__(self, p_Writer):
+        self.Writer = p_Writer
+        self.CaseOwners = {}               # {nodeid: owner}
+        self.CaseReports = {}              # {nodeid: [状态, 开始时间, 运行秒数, [错误堆栈, ]]}
+
+    def pytest_runtest_setup(self, item):
+        m_Marker = item.get_closest_marker("owner")
+        if m_Marker is not None and len(m_Marker.args) != 0:
+            self.CaseOwners[item.nodeid] = str(m_Marker.args[0])
+
+    def pytest_runtest_logreport(self, report):
+        if report.nodeid not in self.CaseReports:
+            self.CaseReports[report.nodeid] = ["SUCCESS", getattr(report, "start", time() - report.duration), 0, []]
+        m_CaseReport = self.CaseReports[report.nodeid]
+        m_CaseReport[2] = m_CaseReport[2] + report.duration
+        if report.failed:
+            # 测试本身失败记为失败，setup/teardown失败记为错误
+            if m_CaseReport[0] != "ERROR":
+                m_CaseReport[0] = "FAILURE" if report.when == "call" else "ERROR"
+            m_CaseReport[3].append(report.longreprtext)
+        elif report.skipped and m_CaseReport[0] == "SUCCESS" and not hasattr(report, "wasxfail"):
+            m_CaseReport[0] = None
+        if report.when != "teardown":
+            return
+        del self.CaseReports[report.nodeid]
+        if m_CaseReport[0] is None:
+            return
+        # Suite为模块路径和测试类，Case为测试函数名(包括参数)
+        m_SuiteName, _, m_CaseName = report.nodeid.rpartition("::")
+        self.Writer.write(MakeTestResultRecord(
+            m_SuiteName, m_CaseName, m_CaseReport[0], m_CaseReport[1], m_CaseReport[2],
+            self.CaseOwners.pop(report.nodeid, None), "\n".join(m_CaseReport[3])))
+
+    def pytest_sessionfinish(self, session):
+        self.Writer.close()
+
+
+def pytest_addoption(parser):
+    m_Group = parser.getgroup("htmltestreport")
+    m_Group.addoption("--htmltestreport-dir", dest="htmltestreport_dir",
+                      help="Write test results as jsonl files, one per worker, into this directory.")
+    m_Group.addoption("--htmltestreport-collect", dest="htmltestreport_collect",
+                      help="Stream test results to a collector started with --collect (unix:PATH or [HOST:]PORT).")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "owner(name): owner of the test case in HtmlTestReport.")
+    m_WorkerInput = getattr(config, "workerinput", None)
+    if m_WorkerInput is None and config.getoption("dist", "no") != "no":
+        # pytest-xdist的主进程只负责分发，结果由每个worker自己写出
+        return
+    m_WorkerID = m_WorkerInput["workerid"] if m_WorkerInput is not None else "master"
+    if config.getoption("htmltestreport_collect"):
+        m_Writer = SocketResultWriter(config.getoption("htmltestreport_collect"))
+    elif config.getoption("htmltestreport_dir"):
+        m_Writer = JsonLinesResultWriter(os.path.join(
+            config.getoption("htmltestreport_dir"), "results-%s-%d.jsonl" % (m_WorkerID, os.getpid())))
+    else:
+        return
+    config.pluginmanager.register(HtmlTestReportPlugin(m_Writer), "htmltestreport-writer")
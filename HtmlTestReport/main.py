@@ -1,18 +1,47 @@
 # -*- coding: utf-8 -*-
-import sys
+# 启动时只导入每次运行都会用到的模块，asyncio、gzip、ElementTree等只在用到的函数中导入
+# 检查启动时间： python -m HtmlTestReport.startup_benchmark
 import os
 import json
-import shutil
 import click
 import copy
-import traceback
-from time import strftime, gmtime
+import datetime
+import re
+import hashlib
+import heapq
+import math
+import contextlib
+from time import strftime, gmtime, perf_counter
 from json import JSONDecodeError
 from enum import Enum
-from xml.sax import saxutils
 
 __version__ = "0.0.1"
 
+# 外存模式下一次最多合并的有序段数量
+MAX_MERGE_FANIN = 64
+
+# --junit-xml生成的文件根节点上的标记，读取目录时跳过这些文件
+JUNIT_XML_GENERATOR = "HtmlTestReport"
+
+# XML 1.0中不允许出现的字符
+XML_INVALID_CHARS = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+# 错误堆栈规范化时需要屏蔽的内容，按顺序替换
+STACK_TRACE_MASKS = [
+    (re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?'), '<TIME>'),
+    (re.compile(r'\d{2}:\d{2}:\d{2}(\.\d+)?'), '<TIME>'),
+    (re.compile(r'0[xX][0-9a-fA-F]+'), '<ADDR>'),
+    (re.compile(r'([A-Za-z]:)?([\\/][\w.\-]+)+[\\/]?'), '<PATH>'),
+    (re.compile(r'\d+'), '<N>'),
+]
+
+
+def EscapeText(p_Text):
+    """
+    转义&、<和>，结果和xml.sax.saxutils.escape相同，不需要在启动时导入xml.sax
+    """
+    return p_Text.replace("&", "&amp;").replace(">", "&gt;").replace("<", "&lt;")
+
 
 # ----------------------------------------------------------------------
 # Template
@@ -72,14 +101,14 @@ class HtmlFileTemplate(object):
 <!DOCTYPE html>
 <html>
 <head>
+    <meta name="content-digest" content="%(digest)s"/>
     <title>%(title)s</title>
     <meta name="generator" content="%(generator)s"/>
     <meta http-equiv="Content-Type" content="text/html; charset=UTF-8"/>
 
     <link href="css/bootstrap.min.css" rel="stylesheet">
-    <script type="text/javascript" src="js/jquery.min.js"></script>
-    <script type="text/javascript" src="js/bootstrap.min.js"></script>
-    <script type="text/javascript" src="js/echarts.min.js"></script>
+    <script type="text/javascript" src="js/jquery.min.js" defer></script>
+    <script type="text/javascript" src="js/bootstrap.min.js" defer></script>
 
     %(stylesheet)s
 
@@ -89,57 +118,184 @@ class HtmlFileTemplate(object):
     output_list = Array();
 
     /* level - 0:Summary; 1:Failed; 2:All */
+    /* 只修改表格和Suite容器上的class，由CSS决定哪些行可见，操作的DOM节点数量和Case数量无关 */
+    var current_level = 0;
+    var touched_suites = Array();
+
     function showCase(level) {
-        trs = document.getElementsByTagName("tr");
-        for (var i = 0; i < trs.length; i++) {
-            tr = trs[i];
-            id = tr.id;
-            if (id.substr(0,2) == 'ft') {
-                if (level < 1) {
-                    tr.className = 'hiddenRow';
-                }
-                else {
-                    tr.className = '';
-                }
+        // 清除单个Suite的展开/折叠状态
+        for (var i = 0; i < touched_suites.length; i++) {
+            touched_suites[i].classList.remove('expanded', 'collapsed');
+        }
+        touched_suites = Array();
+        var table = document.getElementById('result_table');
+        table.classList.remove('level' + current_level);
+        table.classList.add('level' + level);
+        current_level = level;
+    }
+
+
+    function showClassDetail(cid) {
+        var suite = document.getElementById(cid);
+        var visible;
+        if (suite.classList.contains('expanded')) {
+            visible = true;
+        }
+        else if (suite.classList.contains('collapsed')) {
+            visible = false;
+        }
+        else {
+            visible = (current_level == 2) || (current_level == 1 && suite.getAttribute('data-failed') != '0');
+        }
+        suite.classList.remove('expanded', 'collapsed');
+        suite.classList.add(visible ? 'collapsed' : 'expanded');
+        touched_suites.push(suite);
+    }
+
+
+    /* 图表在容器可见时才加载echarts.min.js并初始化，不阻塞页面的显示 */
+    var chart_inits = {};
+    var echarts_state = 0;    /* 0:未加载; 1:加载中; 2:已加载 */
+    var echarts_pending = Array();
+
+    function registerChart(div_id, init) {
+        chart_inits[div_id] = init;
+    }
+
+    function loadECharts(callback) {
+        if (echarts_state == 2) {
+            callback();
+            return;
+        }
+        echarts_pending.push(callback);
+        if (echarts_state == 1) {
+            return;
+        }
+        echarts_state = 1;
+        var script = document.createElement('script');
+        script.src = 'js/echarts.min.js';
+        script.onload = function () {
+            echarts_state = 2;
+            for (var i = 0; i < echarts_pending.length; i++) {
+                echarts_pending[i]();
             }
-            if (id.substr(0,2) == 'pt') {
-                if (level > 1) {
-                    tr.className = '';
-                }
-                else {
-                    tr.className = 'hiddenRow';
+            echarts_pending = Array();
+        };
+        document.head.appendChild(script);
+    }
+
+    function renderChart(div_id) {
+        var init = chart_inits[div_id];
+        if (!init) {
+            return;
+        }
+        delete chart_inits[div_id];
+        loadECharts(function () {
+            var div = document.getElementById(div_id);
+            // 清除静态的SVG图表
+            div.innerHTML = '';
+            init(echarts.init(div));
+        });
+    }
+
+    function startCharts() {
+        var ids = Object.keys(chart_inits);
+        if (!('IntersectionObserver' in window)) {
+            for (var i = 0; i < ids.length; i++) {
+                renderChart(ids[i]);
+            }
+            return;
+        }
+        var observer = new IntersectionObserver(function (entries) {
+            for (var i = 0; i < entries.length; i++) {
+                if (entries[i].isIntersecting) {
+                    observer.unobserve(entries[i].target);
+                    renderChart(entries[i].target.id);
                 }
             }
+        });
+        for (var i = 0; i < ids.length; i++) {
+            observer.observe(document.getElementById(ids[i]));
         }
     }
 
+    document.addEventListener('DOMContentLoaded', startCharts);
+
+
+    /* 基于预先生成的倒排索引搜索，耗时只和命中的行数有关 */
+    var search_matched = Array();
 
-    function showClassDetail(cid, count) {
-        var id_list = Array(count);
-        var toHide = 1;
-        for (var i = 0; i < count; i++) {
-            tid0 = 't' + cid.substr(1) + '.' + (i+1);
-            tid = 'f' + tid0;
-            tr = document.getElementById(tid);
-            if (!tr) {
-                tid = 'p' + tid0;
-                tr = document.getElementById(tid);
+    function searchTokenize(s) {
+        return s.toLowerCase().match(/[a-z0-9]+|[^\x00-\x7f]/g) || [];
+    }
+
+    function searchPostings(token, prefix) {
+        // search_tokens是排好序的，用二分查找定位
+        var lo = 0, hi = search_tokens.length;
+        while (lo < hi) {
+            var mid = (lo + hi) >> 1;
+            if (search_tokens[mid] < token) { lo = mid + 1; } else { hi = mid; }
+        }
+        var result = Array();
+        for (var i = lo; i < search_tokens.length; i++) {
+            if (search_tokens[i] == token || (prefix && search_tokens[i].substr(0, token.length) == token)) {
+                result = result.concat(search_postings[i]);
+                if (!prefix) { break; }
             }
-            id_list[i] = tid;
-            if (tr.className) {
-                toHide = 0;
+            else {
+                break;
             }
         }
-        for (var i = 0; i < count; i++) {
-            tid = id_list[i];
-            if (toHide) {
-                document.getElementById('div_'+tid).style.display = 'none'
-                document.getElementById(tid).className = 'hiddenRow';
+        return result;
+    }
+
+    function searchCase(text) {
+        var table = document.getElementById('result_table');
+        for (var i = 0; i < search_matched.length; i++) {
+            search_matched[i].classList.remove('matched');
+        }
+        search_matched = Array();
+        var tokens = searchTokenize(text);
+        if (tokens.length == 0) {
+            table.classList.remove('searching');
+            document.getElementById('search_count').innerHTML = '';
+            return;
+        }
+        // 多个关键字取交集，最后一个关键字按前缀匹配
+        var hits = null;
+        for (var i = 0; i < tokens.length; i++) {
+            var postings = searchPostings(tokens[i], i == tokens.length - 1);
+            if (hits == null) {
+                hits = postings;
             }
             else {
-                document.getElementById(tid).className = '';
+                var set = {};
+                for (var j = 0; j < postings.length; j++) { set[postings[j]] = true; }
+                hits = hits.filter(function (x) { return set[x]; });
             }
+            if (hits.length == 0) { break; }
+        }
+        var seen = {};
+        for (var i = 0; i < hits.length; i++) {
+            if (seen[hits[i]]) { continue; }
+            seen[hits[i]] = true;
+            var tr = document.getElementById(search_rows[hits[i]]);
+            tr.classList.add('matched');
+            tr.parentNode.classList.add('matched');
+            search_matched.push(tr, tr.parentNode);
+        }
+        table.classList.add('searching');
+        document.getElementById('search_count').innerHTML = Object.keys(seen).length + ' 条匹配';
+    }
+
+
+    /* 第一次展开时才从trace_store中取出错误堆栈 */
+    function showTrace(div_id, trace_id, prefix) {
+        var pre = document.getElementById(div_id).getElementsByTagName('pre')[0];
+        if (!pre.firstChild) {
+            pre.textContent = (prefix ? prefix + ': ' : '') + trace_store[trace_id];
         }
+        showTestDetail(div_id);
     }
 
 
@@ -183,149 +339,179 @@ class HtmlFileTemplate(object):
     <div id="div_base">
         %(heading)s
         %(report)s
+        %(regression)s
+        %(clusters)s
         %(ending)s
         %(chart_script1)s
         %(chart_script2)s
+        %(search_index)s
+        %(trace_store)s
     </div>
 </body>
 </html>
-"""  # variables: (title, generator, stylesheet, heading, report, ending, chart_script)
+"""  # variables: (title, generator, digest, stylesheet, heading, report, regression, clusters, ending, chart_script,
+    #             search_index, trace_store)
 
     ECHARTS_SCRIPT_1 = """
     <script type="text/javascript">
-        // 基于准备好的dom，初始化echarts实例
-        var myChart = echarts.init(document.getElementById('chart1'));
-
-        // 指定图表的配置项和数据
-        var option = {
-            tooltip : {
-                trigger: 'item',
-                formatter: "{a} <br/>{b} : {c} ({d}%%)"
-            },
-            color: ['LightGreen', 'Orange', 'OrangeRed'],
-            legend: {
-                orient: 'vertical',
-                left: 'left',
-                data: ['通过','失败','错误']
-            },
-            series : [
-                {
-                    name: '测试执行情况',
-                    type: 'pie',
-                    radius: ['50%%', '70%%'],
-                    center: ['50%%', '60%%'],
-                    label: {
-                        show: true,
-                        position: 'center',
-                        formatter: '{title|' + '总体测试通过率' +'}'+ '\\n\\r' + '{percent|%(PassPercent)s}',
-                        rich: {
-                            title:{
-                                fontSize: 20,
-                                fontFamily : "Lucida Console",
-                                color:'#454c5c'
-                            },
-                            percent: {
-                                fontFamily : "Lucida Console",
-                                fontSize: 16,
-                                color:'#6c7a89',
-                                lineHeight:30,
-                            },
-                        }
-                    },
-                    data:[
-                        {value:%(Pass)s, name:'通过'},
-                        {value:%(fail)s, name:'失败'},
-                        {value:%(error)s, name:'错误'}
-                    ],
-                    itemStyle: {
-                        emphasis: {
-                            shadowBlur: 10,
-                            shadowOffsetX: 0,
-                            shadowColor: 'rgba(0, 0, 0, 0.5)'
+        // 容器可见时才加载echarts并初始化实例
+        registerChart('chart1', function (myChart) {
+            // 指定图表的配置项和数据
+            var option = {
+                tooltip : {
+                    trigger: 'item',
+                    formatter: "{a} <br/>{b} : {c} ({d}%%)"
+                },
+                color: ['LightGreen', 'Orange', 'OrangeRed'],
+                legend: {
+                    orient: 'vertical',
+                    left: 'left',
+                    data: ['通过','失败','错误']
+                },
+                series : [
+                    {
+                        name: '测试执行情况',
+                        type: 'pie',
+                        radius: ['50%%', '70%%'],
+                        center: ['50%%', '60%%'],
+                        label: {
+                            show: true,
+                            position: 'center',
+                            formatter: '{title|' + '总体测试通过率' +'}'+ '\\n\\r' + '{percent|%(PassPercent)s}',
+                            rich: {
+                                title:{
+                                    fontSize: 20,
+                                    fontFamily : "Lucida Console",
+                                    color:'#454c5c'
+                                },
+                                percent: {
+                                    fontFamily : "Lucida Console",
+                                    fontSize: 16,
+                                    color:'#6c7a89',
+                                    lineHeight:30,
+                                },
+                            }
+                        },
+                        data:[
+                            {value:%(Pass)s, name:'通过'},
+                            {value:%(fail)s, name:'失败'},
+                            {value:%(error)s, name:'错误'}
+                        ],
+                        itemStyle: {
+                            emphasis: {
+                                shadowBlur: 10,
+                                shadowOffsetX: 0,
+                                shadowColor: 'rgba(0, 0, 0, 0.5)'
+                            }
                         }
                     }
-                }
-            ]
-        };
+                ]
+            };
 
-        // 使用刚指定的配置项和数据显示图表。
-        myChart.setOption(option);
+            // 使用刚指定的配置项和数据显示图表。
+            myChart.setOption(option);
+        });
     </script>
     """  # variables: (PassPercent, Pass, fail, error)
 
     ECHARTS_SCRIPT_2 = """
     <script type="text/javascript">
-        // 基于准备好的dom，初始化echarts实例
-        var myChart = echarts.init(document.getElementById('chart2'));
-
-        // 指定图表的配置项和数据
-        option = {
-            tooltip: {
-                trigger: 'axis',
-                axisPointer: {            // Use axis to trigger tooltip
-                    type: 'shadow'        // 'shadow' as default; can also be 'line' or 'shadow'
-                }
-            },
-            color: ['OrangeRed','Orange', 'LightGreen'],
-            legend: {
-                data: ['错误', '失败', '成功'],
-            },
-            grid: {
-                left: '3%%',
-                right: '4%%',
-                bottom: '3%%',
-                containLabel: true
-            },
-            xAxis: {
-                type: 'value'
-            },
-            yAxis: {
-                type: 'category',
-                data: [%(userlist)s]
-            },
-            series: [
-                {
-                    name: '错误',
-                    type: 'bar',
-                    stack: 'total',
-                    label: {
-                        show: true
-                    },
-                    emphasis: {
-                        focus: 'series'
-                    },
-                    data: [%(userdata_error)s]
+        // 容器可见时才加载echarts并初始化实例
+        registerChart('chart2', function (myChart) {
+            // 指定图表的配置项和数据
+            var option = {
+                tooltip: {
+                    trigger: 'axis',
+                    axisPointer: {            // Use axis to trigger tooltip
+                        type: 'shadow'        // 'shadow' as default; can also be 'line' or 'shadow'
+                    }
                 },
-                {
-                    name: '失败',
-                    type: 'bar',
-                    stack: 'total',
-                    label: {
-                        show: true
-                    },
-                    emphasis: {
-                        focus: 'series'
-                    },
-                    data: [%(userdata_fail)s]
+                color: ['OrangeRed','Orange', 'LightGreen'],
+                legend: {
+                    data: ['错误', '失败', '成功'],
                 },
-                {
-                    name: '成功',
-                    type: 'bar',
-                    stack: 'total',
-                    label: {
-                        show: true
+                grid: {
+                    left: '3%%',
+                    right: '4%%',
+                    bottom: '3%%',
+                    containLabel: true
+                },
+                xAxis: {
+                    type: 'value'
+                },
+                yAxis: {
+                    type: 'category',
+                    data: [%(userlist)s]
+                },
+                series: [
+                    {
+                        name: '错误',
+                        type: 'bar',
+                        stack: 'total',
+                        label: {
+                            show: true
+                        },
+                        emphasis: {
+                            focus: 'series'
+                        },
+                        data: [%(userdata_error)s]
                     },
-                    emphasis: {
-                        focus: 'series'
+                    {
+                        name: '失败',
+                        type: 'bar',
+                        stack: 'total',
+                        label: {
+                            show: true
+                        },
+                        emphasis: {
+                            focus: 'series'
+                        },
+                        data: [%(userdata_fail)s]
                     },
-                    data: [%(userdata_pass)s]
-                },
-          ]
-        };
-        // 使用刚指定的配置项和数据显示图表。
-        myChart.setOption(option);
+                    {
+                        name: '成功',
+                        type: 'bar',
+                        stack: 'total',
+                        label: {
+                            show: true
+                        },
+                        emphasis: {
+                            focus: 'series'
+                        },
+                        data: [%(userdata_pass)s]
+                    },
+                ]
+            };
+            // 使用刚指定的配置项和数据显示图表。
+            myChart.setOption(option);
+        });
     </script>
-    """  # variables: (PassPercent, Pass, fail, error)
+    """  # variables: (userlist, userdata_error, userdata_fail, userdata_pass)
+
+    # 静态的SVG图表，在echarts加载完成之前(或无法加载时)显示
+    CHART1_SVG_TMPL = """<svg width="100%%" height="300" viewBox="0 0 300 300" xmlns="http://www.w3.org/2000/svg">
+            <circle cx="150" cy="170" r="90" fill="none" stroke="LightGreen" stroke-width="40"
+                stroke-dasharray="%(pass_len)s %(circumference)s" transform="rotate(-90 150 170)"/>
+            <circle cx="150" cy="170" r="90" fill="none" stroke="Orange" stroke-width="40"
+                stroke-dasharray="%(fail_len)s %(circumference)s" stroke-dashoffset="-%(fail_offset)s"
+                transform="rotate(-90 150 170)"/>
+            <circle cx="150" cy="170" r="90" fill="none" stroke="OrangeRed" stroke-width="40"
+                stroke-dasharray="%(error_len)s %(circumference)s" stroke-dashoffset="-%(error_offset)s"
+                transform="rotate(-90 150 170)"/>
+            <text x="150" y="165" text-anchor="middle" font-size="16" fill="#454c5c">总体测试通过率</text>
+            <text x="150" y="190" text-anchor="middle" font-size="14" fill="#6c7a89">%(PassPercent)s</text>
+        </svg>"""  # variables: (pass_len, fail_len, fail_offset, error_len, error_offset, circumference, PassPercent)
+
+    CHART2_SVG_TMPL = """<svg width="100%%" height="300" viewBox="0 0 300 %(height)s"
+            preserveAspectRatio="xMinYMin meet" xmlns="http://www.w3.org/2000/svg">%(bars)s
+        </svg>"""  # variables: (height, bars)
+
+    CHART2_SVG_BAR_TMPL = """
+            <text x="85" y="%(text_y)s" text-anchor="end" font-size="10">%(owner)s</text>
+            <rect x="90" y="%(y)s" width="%(error_len)s" height="14" fill="OrangeRed"/>
+            <rect x="%(fail_x)s" y="%(y)s" width="%(fail_len)s" height="14" fill="Orange"/>
+            <rect x="%(pass_x)s" y="%(y)s" width="%(pass_len)s" height="14" fill="LightGreen"/>"""
+    # variables: (owner, y, text_y, error_len, fail_x, fail_len, pass_x, pass_len)
 
     # ------------------------------------------------------------------------
     # Stylesheet
@@ -403,6 +589,16 @@ class HtmlFileTemplate(object):
     .failCase   { color: Orange; font-weight: bold; }
     .errorCase  { color: OrangeRed; font-weight: bold; }
     .hiddenRow  { display: none; }
+    #result_table tr.caseRow                    { display: none; }
+    #result_table.level1 tr.failRow,
+    #result_table.level2 tr.caseRow,
+    #result_table tbody.expanded tr.caseRow     { display: table-row; }
+    #result_table tbody.collapsed tr.caseRow    { display: none; }
+    #result_table.searching tbody tr.caseRow,
+    #result_table.searching tbody tr.suiteRow   { display: none; }
+    #result_table.searching tbody tr.caseRow.matched,
+    #result_table.searching tbody.matched tr.suiteRow { display: table-row; }
+    #search_box { width: 300px; display: inline-block; margin-left: 1em; }
     .testcase   { margin-left: 2em; }
 
 
@@ -433,10 +629,10 @@ class HtmlFileTemplate(object):
     </div>
     <div style="float: left;width:100%%;">
         <div style="float: left;width:40%%;"><p class='description'>%(description)s</p></div>
-        <div id="chart1" style="width:30%%;height:300px;float:left;"></div>
-        <div id="chart2" style="width:30%%;height:300px;float:left;"></div>
+        <div id="chart1" style="width:30%%;height:300px;float:left;">%(chart1_fallback)s</div>
+        <div id="chart2" style="width:30%%;height:300px;float:left;">%(chart2_fallback)s</div>
     </div>
-"""  # variables: (title, parameters, description)
+"""  # variables: (title, parameters, description, chart1_fallback, chart2_fallback)
 
     HEADING_ATTRIBUTE_TMPL = """<p class='attribute'><strong>%(name)s:</strong> %(value)s</p>
 """  # variables: (name, value)
@@ -451,8 +647,9 @@ class HtmlFileTemplate(object):
         <button class="btn btn-default" onclick='javascript:showCase(1)'>失败</button>
         <button class="btn btn-default" onclick='javascript:showCase(2)'>全部</button>
     </div>
+    %(search_box)s
     <p></p>
-    <table id='result_table' class="table table-bordered">
+    <table id='result_table' class="table table-bordered level0">
         <colgroup>
             <col align='left' />
             <col align='right' />
@@ -482,17 +679,30 @@ class HtmlFileTemplate(object):
             <td align='right'>%(error)s</td>
             <td align='center'>--------</td>            
             <td align='center'>%(starttime)s</td>
-            <td align='center'>%(elapsedtime)s</td>
+            <td align='center' title='%(elapsedtitle)s'>%(elapsedtime)s</td>
             <td align='center'>--------</td>
             <td>&nbsp;</td>
             <td>&nbsp;</td>
         </tr>
     </table>
-"""  # variables: (test_list, count, Pass, fail, error)
+"""  # variables: (search_box, test_list, count, Pass, fail, error, starttime, elapsedtime, elapsedtitle)
+
+    SEARCH_BOX_TMPL = u"""<input id='search_box' type='text' class='form-control input-sm'
+        placeholder='搜索用例/负责人/RTI/首次失败版本' oninput='searchCase(this.value)'/>
+    <span id='search_count'></span>"""
+
+    SEARCH_INDEX_TMPL = u"""
+    <script type="text/javascript">
+        var search_rows = %(rows)s;
+        var search_tokens = %(tokens)s;
+        var search_postings = %(postings)s;
+    </script>
+"""  # variables: (rows, tokens, postings)
 
     # 整个Suite的统计信息
     REPORT_CLASS_TMPL = u"""
-    <tr class='%(style)s'>
+    <tbody id='%(cid)s' data-failed='%(failed)s'>
+    <tr class='suiteRow %(style)s'>
         <td>%(desc)s</td>
         <td align='right'>%(count)s</td>
         <td align='right'>%(Pass)s</td>
@@ -500,11 +710,15 @@ class HtmlFileTemplate(object):
         <td align='right'>%(error)s</td>
         <td align='center'>%(owner)s</td>
         <td align='center'>%(starttime)s</td>
-        <td align='center'>%(elapsedtime)s</td>
+        <td align='center' title='%(elapsedtitle)s'>%(elapsedtime)s</td>
         <td align='center'>%(firstbadlabel)s</td>
-        <td colspan=2 align='center'><a href="javascript:showClassDetail('%(cid)s',%(count)s)">详情</a></td>
+        <td colspan=2 align='center'><a href="javascript:showClassDetail('%(cid)s')">详情</a></td>
     </tr>
-"""  # variables: (style, desc, count, Pass, fail, error, cid)
+"""  # variables: (style, desc, count, Pass, fail, error, cid, failed, elapsedtime, elapsedtitle)
+
+    REPORT_CLASS_END_TMPL = u"""
+    </tbody>
+"""
 
     # 具体Case的统计信息
     REPORT_TEST_WITH_OUTPUT_TMPL = r"""
@@ -512,10 +726,10 @@ class HtmlFileTemplate(object):
     <td class='%(style)s'><div class='testcase'>%(desc)s</div></td>
     <td colspan='4' align='center'>
         <!--css div popup start-->
-        <a class="popup_link" onfocus='this.blur();' href="javascript:showTestDetail('div_%(tid)s')" >
+        <a class="popup_link" onfocus='this.blur();' href="javascript:showTrace('div_%(tid)s','%(trace_id)s','%(tid)s')" >
             %(status)s</a>
         <div id='div_%(tid)s' class="popup_window">
-            <pre>%(script)s</pre>
+            <pre></pre>
         </div>
         <!--css div popup end-->
     </td>
@@ -526,7 +740,7 @@ class HtmlFileTemplate(object):
     <td align='center'><a href="%(link)s">详细测试报告</a></td>
     <td align='center'><a href="%(download)s">运行日志下载</a></td>
 </tr>
-"""  # variables: (tid, Class, style, desc, link, status)
+"""  # variables: (tid, Class, style, desc, link, status, trace_id)
 
     # 具体Case的统计信息
     REPORT_TEST_NO_OUTPUT_TMPL = r"""
@@ -542,7 +756,197 @@ class HtmlFileTemplate(object):
 </tr>
 """  # variables: (tid, Class, style, desc, status)
 
-    REPORT_TEST_OUTPUT_TMPL = r"""%(id)s: %(output)s"""  # variables: (id, output)
+    # 超出行数预算时，一个Suite中被省略的通过Case合并为一行
+    REPORT_ELIDED_TMPL = r"""
+<tr id='%(tid)s' class='caseRow passRow elidedRow'>
+    <td class='none'><div class='testcase'>已省略 %(count)s 个通过的用例</div></td>
+    <td colspan='4' align='center'>通过</td>
+    <td align='center'>%(owner)s</td>
+    <td align='center'>%(starttime)s</td>
+    <td align='center' title='累计运行耗时'>%(elapsedtime)s</td>
+    <td align='center'>&nbsp;</td>
+    <td colspan=2 align='center'>%(sidecar)s</td>
+</tr>
+"""  # variables: (tid, count, owner, starttime, elapsedtime, sidecar)
+
+    REPORT_ELIDED_SIDECAR_TMPL = u"""<a href="%(sidecar)s">省略的用例列表</a>"""
+
+    # 所有错误堆栈只输出一次，行中按照trace_id引用
+    TRACE_STORE_TMPL = u"""
+    <script type="text/javascript">
+        var trace_store = %(traces)s;
+    </script>
+"""  # variables: (traces)
+
+    # ------------------------------------------------------------------------
+    # Run Diff
+    #
+
+    DIFF_SECTION_TMPL = u"""
+    <h4>%(name)s (%(count)s)</h4>
+    <table class="table table-bordered">
+        <tr id='header_row'>
+            <td align='center'>测试套件/测试用例</td>
+            <td align='center'>负责人</td>
+            <td align='center'>上次状态</td>
+            <td align='center'>本次状态</td>
+            <td align='center'>RTI</td>
+            <td align='center'>首次失败版本</td>
+            <td align='center'>详细日志</td>
+        </tr>
+        %(case_list)s
+    </table>
+"""  # variables: (name, count, case_list)
+
+    DIFF_CASE_TMPL = u"""
+        <tr>
+            <td>%(suite)s / %(case)s</td>
+            <td align='center'>%(owner)s</td>
+            <td align='center'>%(previous)s</td>
+            <td align='center'>%(current)s</td>
+            <td align='center'>%(rti)s</td>
+            <td align='center'>%(firstbadlabel)s</td>
+            <td align='center'><a href="%(link)s">详细测试报告</a></td>
+        </tr>
+"""  # variables: (suite, case, owner, previous, current, rti, firstbadlabel, link)
+
+    DIFF_EMPTY_TMPL = u"""<p>两次运行结果没有差异</p>"""
+
+    # ------------------------------------------------------------------------
+    # Duration Regression
+    #
+
+    REGRESSION_TMPL = u"""
+    <h4>运行时长回退（与基线相比）</h4>
+    <table id='regression_suite_table' class="table table-bordered">
+        <tr id='header_row'>
+            <td align='center'>测试套件</td>
+            <td align='center'>回退用例数</td>
+            <td align='center'>基线耗时</td>
+            <td align='center'>本次耗时</td>
+            <td align='center'>增加耗时</td>
+        </tr>
+        %(suite_list)s
+    </table>
+    <table id='regression_table' class="table table-bordered">
+        <tr id='header_row'>
+            <td align='center'>测试套件/测试用例</td>
+            <td align='center'>负责人</td>
+            <td align='center'>基线耗时</td>
+            <td align='center'>本次耗时</td>
+            <td align='center'>增加耗时</td>
+            <td align='center'>增长比例</td>
+        </tr>
+        %(case_list)s
+    </table>
+"""  # variables: (suite_list, case_list)
+
+    REGRESSION_SUITE_TMPL = u"""
+        <tr class='failClass'>
+            <td>%(suite)s</td>
+            <td align='right'>%(count)s</td>
+            <td align='center'>%(baseline)s</td>
+            <td align='center'>%(current)s</td>
+            <td align='center'>%(delta)s</td>
+        </tr>
+"""  # variables: (suite, count, baseline, current, delta)
+
+    REGRESSION_CASE_TMPL = u"""
+        <tr>
+            <td>%(suite)s / %(case)s</td>
+            <td align='center'>%(owner)s</td>
+            <td align='center'>%(baseline)s</td>
+            <td align='center'>%(current)s</td>
+            <td align='center'>%(delta)s</td>
+            <td align='center'>%(ratio)s</td>
+        </tr>
+"""  # variables: (suite, case, owner, baseline, current, delta, ratio)
+
+    # ------------------------------------------------------------------------
+    # Failure Clusters
+    #
+
+    CLUSTER_TMPL = u"""
+    <h4>失败聚类（按错误堆栈指纹）</h4>
+    <table id='cluster_table' class="table table-bordered">
+        <tr id='header_row'>
+            <td align='center'>指纹</td>
+            <td align='center'>用例数</td>
+            <td align='center'>负责人</td>
+            <td align='center'>用例(部分)</td>
+            <td align='center'>典型错误堆栈</td>
+        </tr>
+        %(cluster_list)s
+    </table>
+"""  # variables: (cluster_list)
+
+    CLUSTER_ROW_TMPL = u"""
+        <tr>
+            <td align='center'>%(fingerprint)s</td>
+            <td align='right'>%(count)s</td>
+            <td align='center'>%(owner)s</td>
+            <td>%(cases)s</td>
+            <td>
+                <a class="popup_link" onfocus='this.blur();'
+                    href="javascript:showTrace('div_%(fingerprint)s','%(trace_id)s','')">
+                    查看</a>
+                <div id='div_%(fingerprint)s' class="popup_window">
+                    <pre></pre>
+                </div>
+            </td>
+        </tr>
+"""  # variables: (fingerprint, count, owner, cases, trace_id)
+
+    # 每个聚类中列出的用例数量
+    CLUSTER_SAMPLE_CASES = 5
+
+    # ------------------------------------------------------------------------
+    # Split Index
+    #
+
+    INDEX_TMPL = r"""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>%(title)s</title>
+    <meta name="generator" content="%(generator)s"/>
+    <meta http-equiv="Content-Type" content="text/html; charset=UTF-8"/>
+    <link href="css/bootstrap.min.css" rel="stylesheet">
+</head>
+<body>
+<div class="container-fluid">
+    <h1>%(title)s</h1>
+    <p><a href="%(report)s">完整报告</a></p>
+    <table id='index_table' class="table table-bordered">
+        <tr id='header_row'>
+            <td align='center'>%(split_name)s</td>
+            <td align='center'>总数</td>
+            <td align='center'>通过</td>
+            <td align='center'>失败</td>
+            <td align='center'>错误</td>
+            <td align='center'>开始时间</td>
+            <td align='center'>运行耗时</td>
+            <td align='center'>报告</td>
+        </tr>
+        %(slice_list)s
+    </table>
+</div>
+</body>
+</html>
+"""  # variables: (title, generator, report, split_name, slice_list)
+
+    INDEX_ROW_TMPL = u"""
+        <tr class='%(style)s'>
+            <td>%(name)s</td>
+            <td align='right'>%(count)s</td>
+            <td align='right'>%(Pass)s</td>
+            <td align='right'>%(fail)s</td>
+            <td align='right'>%(error)s</td>
+            <td align='center'>%(starttime)s</td>
+            <td align='center' title='%(elapsedtitle)s'>%(elapsedtime)s</td>
+            <td align='center'><a href="%(link)s">查看</a></td>
+        </tr>
+"""  # variables: (style, name, count, Pass, fail, error, starttime, elapsedtime, elapsedtitle, link)
 
     # ------------------------------------------------------------------------
     # ENDING
@@ -567,6 +971,7 @@ class TestCase(object):
         self.CaseStatus = TestCaseStatus.UNKNOWN
         self.CaseDescription = ""
         self.ErrorStackTrace = ""
+        self.ErrorStackTraceID = ""            # 错误堆栈在TraceStore中的ID
         # tid 命名方法：  pt%d%d     成功Case
         # tid 命名方法：  ft%d%d     失败Case  %suiteid.%caseid
         self.tid = ""  # case id
@@ -577,6 +982,8 @@ class TestCase(object):
         self.CaseOwner = ""
         self.CaseRTI = ""                      # Case的Regress Tracking Issue ID
         self.CaseFirstBadLabel = ""            # Case第一次失败的版本
+        self.CaseTraceFingerprint = ""         # 规范化以后的错误堆栈的指纹，用于失败聚类
+        self.Attempts = []                     # 所有的运行记录 [(CaseStartTime, 状态名称), ]，按时间排序
 
     def getCaseRTI(self):
         return self.CaseRTI
@@ -590,6 +997,27 @@ class TestCase(object):
     def setCaseFirstBadLabel(self, p_CaseFirstBadLabel):
         self.CaseFirstBadLabel = p_CaseFirstBadLabel
 
+    def getCaseTraceFingerprint(self):
+        return self.CaseTraceFingerprint
+
+    def setCaseTraceFingerprint(self, p_CaseTraceFingerprint):
+        self.CaseTraceFingerprint = p_CaseTraceFingerprint
+
+    def getAttempts(self):
+        return self.Attempts
+
+    def setAttempts(self, p_Attempts):
+        self.Attempts = p_Attempts
+
+    def mergeAttempts(self, p_Attempts):
+        # 合并其他运行记录，完全相同的记录只保留一份
+        self.Attempts = sorted(set([tuple(m_Attempt) for m_Attempt in self.Attempts + list(p_Attempts)]))
+
+    def isFlaky(self):
+        # 多次运行中既有成功也有失败(或错误)
+        m_StatusSet = set([m_Status == TestCaseStatus.SUCCESS.name for _, m_Status in self.Attempts])
+        return len(m_StatusSet) > 1
+
     def getCaseName(self):
         return self.CaseName
 
@@ -635,6 +1063,12 @@ class TestCase(object):
     def setErrorStackTrace(self, p_ErrorStackTrace):
         self.ErrorStackTrace = p_ErrorStackTrace
 
+    def getErrorStackTraceID(self):
+        return self.ErrorStackTraceID
+
+    def setErrorStackTraceID(self, p_ErrorStackTraceID):
+        self.ErrorStackTraceID = p_ErrorStackTraceID
+
     def setTID(self, p_TID):
         self.tid = p_TID
 
@@ -647,6 +1081,41 @@ class TestCase(object):
     def setDetailReportLink(self, p_DetailReportLink):
         self.DetailReportLink = p_DetailReportLink
 
+    def toDict(self):
+        m_Dict = dict(self.__dict__)
+        m_Dict["CaseStatus"] = self.CaseStatus.name
+        return m_Dict
+
+    @classmethod
+    def fromDict(cls, p_Dict):
+        m_TestCase = cls()
+        for m_Key in m_TestCase.__dict__.keys():
+            if m_Key in p_Dict:
+                setattr(m_TestCase, m_Key, p_Dict[m_Key])
+        m_TestCase.CaseStatus = TestCaseStatus[p_Dict["CaseStatus"]]
+        return m_TestCase
+
+
+class TraceStore(object):
+    # 按内容Hash保存错误堆栈，相同的内容在内存和报告中都只保存一份
+    def __init__(self):
+        self.Traces = {}
+
+    def intern(self, p_TestCase):
+        m_Trace = p_TestCase.getErrorStackTrace()
+        if m_Trace == "":
+            return
+        m_TraceID = hashlib.sha1(m_Trace.encode('utf-8')).hexdigest()[:16]
+        if m_TraceID in self.Traces:
+            # 使用已经保存的字符串，释放重复的内容
+            p_TestCase.setErrorStackTrace(self.Traces[m_TraceID])
+        else:
+            self.Traces[m_TraceID] = m_Trace
+        p_TestCase.setErrorStackTraceID(m_TraceID)
+
+    def getTrace(self, p_TraceID):
+        return self.Traces[p_TraceID]
+
 
 class TestSuite(object):
     def __init__(self):
@@ -656,10 +1125,13 @@ class TestSuite(object):
         self.PassedCaseCount = 0
         self.FailedCaseCount = 0
         self.ErrorCaseCount = 0
+        self.FlakyCaseCount = 0
         self.sid = 0
         self.max_tid = 1
         self.SuiteStartTime = ""
-        self.SuiteElapsedTime = 0          # 用秒来计算的运行时间
+        self.SuiteElapsedTime = 0          # 用秒来计算的运行时间，所有Case运行时间的累计
+        self.SuiteIntervals = []           # 所有Case运行时间区间的并集 [[开始, 结束], ]
+        self.SuiteWallClockTime = None     # 运行时间区间并集的长度(秒)，无法解析开始时间时为None
         self.SuiteOwnerList = ""           # Suite的所有人，可能包含多个人，多个人用逗号分割
         self.SuiteFirstBadLabel = ""       # 第一次出问题的Label
 
@@ -687,6 +1159,12 @@ class TestSuite(object):
     def setSuiteElapsedTime(self, p_SuiteElapsedTime):
         self.SuiteElapsedTime = p_SuiteElapsedTime
 
+    def getSuiteIntervals(self):
+        return self.SuiteIntervals
+
+    def getSuiteWallClockTime(self):
+        return self.SuiteWallClockTime
+
     def setSuiteName(self, p_SuiteName):
         self.SuiteName = p_SuiteName
 
@@ -697,6 +1175,7 @@ class TestSuite(object):
     def SummaryTestCase(self):
         m_OldCases = copy.copy(self.TestCases)
         m_TestCasesOwnerList = []
+        m_Intervals = []
         self.TestCases = []
         for m_case in m_OldCases:
             if m_case.getCaseStatus() == TestCaseStatus.SUCCESS:
@@ -705,12 +1184,17 @@ class TestSuite(object):
                 self.FailedCaseCount = self.FailedCaseCount + 1
             if m_case.getCaseStatus() == TestCaseStatus.ERROR:
                 self.ErrorCaseCount = self.ErrorCaseCount + 1
+            if m_case.isFlaky():
+                self.FlakyCaseCount = self.FlakyCaseCount + 1
             # 从Suite中查找最早的StartTime以及累计ElapsedTime
             if self.getSuiteStartTime() == "":
                 self.setSuiteStartTime(m_case.getCaseStartTime())
             elif self.getSuiteStartTime() > m_case.getCaseStartTime():
                 self.setSuiteStartTime(m_case.getCaseStartTime())
             self.setSuiteElapsedTime(self.getSuiteElapsedTime() + int(m_case.getCaseElapsedTime()))
+            m_StartTime = ParseCaseStartTime(m_case.getCaseStartTime())
+            if m_StartTime is not None:
+                m_Intervals.append((m_StartTime, m_StartTime + int(m_case.getCaseElapsedTime())))
             if self.getSuiteFirstBadLabel() == "":
                 self.setSuiteFirstBadLabel(m_case.getCaseFirstBadLabel())
             elif self.getSuiteFirstBadLabel() > m_case.getCaseFirstBadLabel():
@@ -723,6 +1207,10 @@ class TestSuite(object):
             self.TestCases.append(m_case)
         #拼接整个Suite的Owner，即把所有Case的Owner都用逗号隔开
         self.SuiteOwnerList = ','.join(m_TestCasesOwnerList)
+        # 实际运行时间是所有Case运行区间并集的长度
+        if len(m_Intervals) != 0:
+            self.SuiteIntervals = UnionIntervals(m_Intervals)
+            self.SuiteWallClockTime = sum([m_End - m_Start for m_Start, m_End in self.SuiteIntervals])
 
     def getSuiteDescription(self):
         return self.SuiteDescription
@@ -739,6 +1227,9 @@ class TestSuite(object):
     def getErrorCaseCount(self):
         return self.ErrorCaseCount
 
+    def getFlakyCaseCount(self):
+        return self.FlakyCaseCount
+
     def setSID(self, p_SID):
         self.sid = p_SID
 
@@ -746,6 +1237,34 @@ class TestSuite(object):
         return self.sid
 
 
+class DurationRegression(object):
+    # 和基线相比运行时长发生回退的Case
+    def __init__(self):
+        self.SuiteName = None
+        self.CaseName = None
+        self.CaseOwner = ""
+        self.BaselineElapsedTime = 0       # 基线中的运行时间(秒)
+        self.CurrentElapsedTime = 0        # 本次的运行时间(秒)
+
+    def getDelta(self):
+        return self.CurrentElapsedTime - self.BaselineElapsedTime
+
+    def getRatio(self):
+        if self.BaselineElapsedTime == 0:
+            return None
+        return self.getDelta() / self.BaselineElapsedTime
+
+
+class RunDiff(object):
+    # 两次运行结果之间的差异，每个列表的元素为(上次的TestCase, 本次的TestCase, SuiteName)
+    def __init__(self):
+        self.NewFailures = []              # 上次通过，本次失败或错误
+        self.NewPasses = []                # 上次失败或错误，本次通过
+        self.StillFailing = []             # 两次都失败或错误
+        self.AddedCases = []               # 上次没有，本次新增
+        self.MissingCases = []             # 上次存在，本次消失
+
+
 class TestResult(object):
     # note: _TestResult is a pure representation of results.
     # It lacks the output and reporting ability compares to unittest._TextTestResult.
@@ -755,11 +1274,18 @@ class TestResult(object):
         self.pass_count = 0
         self.fail_count = 0
         self.error_count = 0
+        self.flaky_count = 0
         self.max_sid = 1
         self.starttime = ""
         self.elapsedtime = 0
+        self.intervals = []                # 所有Suite的运行区间
         self.Title = "未知标题"
         self.Description = "无描述信息"
+        self.DurationRegressions = []      # 和基线相比运行时长发生回退的Case
+        self.RunDiff = None                # 和上次运行相比的差异，为None时生成完整报告
+        self.TraceStore = TraceStore()     # 所有Case的错误堆栈
+        self.PhaseTimings = []             # 生成报告各个阶段的耗时 [(阶段, 秒), ]
+        self.OwnerStatistics = None        # 增量维护的Owner统计信息，为None时生成报告时再统计
 
     def getTitle(self):
         return self.Title
@@ -782,19 +1308,59 @@ class TestResult(object):
     def getTestElapsedTime(self):
         return self.elapsedtime
 
+    def getTestWallClockTime(self):
+        # 整体的实际运行时间，无法解析开始时间时为None
+        if len(self.intervals) == 0:
+            return None
+        # 区间在addSuite中只是简单追加，这里合并一次，合并后的结果保留下来
+        self.intervals = UnionIntervals(self.intervals)
+        return sum([m_End - m_Start for m_Start, m_End in self.intervals])
+
     def setTestElapsedTime(self, p_TestElapsedTime):
         self.elapsedtime = p_TestElapsedTime
 
+    def getDurationRegressions(self):
+        return self.DurationRegressions
+
+    def setDurationRegressions(self, p_DurationRegressions):
+        self.DurationRegressions = p_DurationRegressions
+
+    def getTraceStore(self):
+        return self.TraceStore
+
+    def getPhaseTimings(self):
+        return self.PhaseTimings
+
+    def addPhaseTiming(self, p_Phase, p_Seconds):
+        self.PhaseTimings.append((p_Phase, p_Seconds))
+
+    def getOwnerStatistics(self):
+        return self.OwnerStatistics
+
+    def setOwnerStatistics(self, p_OwnerStatistics):
+        self.OwnerStatistics = p_OwnerStatistics
+
+    def setTraceStore(self, p_TraceStore):
+        self.TraceStore = p_TraceStore
+
+    def getRunDiff(self):
+        return self.RunDiff
+
+    def setRunDiff(self, p_RunDiff):
+        self.RunDiff = p_RunDiff
+
     def addSuite(self, p_TestSuite):
         # 更新TestResult的全局统计信息
         self.pass_count = self.pass_count + p_TestSuite.PassedCaseCount
         self.fail_count = self.fail_count + p_TestSuite.FailedCaseCount
         self.error_count = self.error_count + p_TestSuite.ErrorCaseCount
+        self.flaky_count = self.flaky_count + p_TestSuite.FlakyCaseCount
         if self.getTestStartTime() == "":
             self.setTestStartTime(p_TestSuite.getSuiteStartTime())
         elif self.getTestStartTime() > p_TestSuite.getSuiteStartTime():
             self.setTestStartTime(p_TestSuite.getSuiteStartTime())
         self.setTestElapsedTime(self.getTestElapsedTime() + p_TestSuite.getSuiteElapsedTime())
+        self.intervals.extend(p_TestSuite.getSuiteIntervals())
 
         m_TestSuite = copy.copy(p_TestSuite)
         m_TestSuite.setSID(self.max_sid)
@@ -804,8 +1370,44 @@ class TestResult(object):
 
 class HTMLTestRunner(HtmlFileTemplate):
 
-    def __init__(self, title=None, description=None):
+    # 搜索索引的分词规则，和页面中的searchTokenize保持一致
+    SEARCH_TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[^\x00-\x7f]')
+
+    # 写文件时每次写入的字符数
+    WRITE_CHUNK_SIZE = 1024 * 1024
+
+    # OpenMetrics指标的前缀以及Case运行时长的分位数
+    METRICS_PREFIX = "htmltestreport"
+    METRICS_QUANTILES = [0.5, 0.9, 0.99]
+
+    # 报告文件头中的内容摘要
+    DIGEST_PLACEHOLDER = "@@CONTENT_DIGEST@@"
+    DIGEST_PATTERN = re.compile(r'<meta name="content-digest" content="([0-9a-f]+)"/>')
+
+    # 负责人图表中最多显示的类别数量，超出的部分合并为"其他"
+    DEFAULT_CHART_TOP_K = 20
+
+    # 超出行数预算时，除失败和错误的Case外，单独显示的最慢的通过Case数量
+    DEFAULT_KEEP_SLOWEST = 10
+
+    # 没有指定--gzip时，压缩附属文件使用的级别
+    DEFAULT_GZIP_LEVEL = 6
+
+    def __init__(self, title=None, description=None, search_index=True, static_charts=False, workers=1,
+                 gzip_level=None, chart_top_k=DEFAULT_CHART_TOP_K, chart_sort_by="total", chart_group_by="owner",
+                 team_map=None, row_budget=None, keep_slowest=DEFAULT_KEEP_SLOWEST, elided_sidecar=False):
         self.stopTime = 0
+        self.row_budget = row_budget                  # 报告中Case行数的预算，为None时不限制
+        self.keep_slowest = keep_slowest
+        self.elided_sidecar = elided_sidecar          # 是否把省略的Case写入压缩的附属文件
+        self.chart_top_k = chart_top_k
+        self.chart_sort_by = chart_sort_by            # failures, errors, total
+        self.chart_group_by = chart_group_by          # owner, suite-owner, team
+        self.team_map = team_map or {}                # {CaseOwner: Team}
+        self.gzip_level = gzip_level
+        self.workers = workers
+        self.search_index = search_index
+        self.static_charts = static_charts
 
         if title is None:
             self.title = self.DEFAULT_TITLE
@@ -822,7 +1424,7 @@ class HTMLTestRunner(HtmlFileTemplate):
         Override this to add custom attributes.
         """
         startTime = str(result.starttime)
-        duration = strftime("%H:%M:%S", gmtime(int(result.elapsedtime)))
+        duration = self._format_wallclock(result.getTestWallClockTime(), result.getTestElapsedTime())
         status = []
         if result.pass_count:
             status.append(u'通过 %s' % result.pass_count)
@@ -830,52 +1432,435 @@ class HTMLTestRunner(HtmlFileTemplate):
             status.append(u'失败 %s' % result.fail_count)
         if result.error_count:
             status.append(u'错误 %s' % result.error_count)
+        if result.flaky_count:
+            status.append(u'不稳定 %s' % result.flaky_count)
         if status:
             status = ' '.join(status)
         else:
             status = 'none'
-        return [
+        m_Attributes = [
             (u'开始时间', startTime),
             (u'运行时长', duration),
-            (u'状态', status),
         ]
+        if result.getTestWallClockTime() is not None:
+            m_Attributes.append((u'累计测试时长', strftime("%H:%M:%S", gmtime(int(result.getTestElapsedTime())))))
+            if result.getTestWallClockTime() > 0:
+                m_Attributes.append(
+                    (u'并行度', "{:.2f}".format(int(result.getTestElapsedTime()) / result.getTestWallClockTime())))
+        m_Attributes.append((u'状态', status))
+        m_RunDiff = result.getRunDiff()
+        if m_RunDiff is not None:
+            m_Attributes.append(
+                (u'与上次相比',
+                 u'新增失败 %s 新增通过 %s 持续失败 %s 新增用例 %s 消失用例 %s' % (
+                     len(m_RunDiff.NewFailures), len(m_RunDiff.NewPasses), len(m_RunDiff.StillFailing),
+                     len(m_RunDiff.AddedCases), len(m_RunDiff.MissingCases))))
+        return m_Attributes
 
     def generateReport(self, result, p_output):
         generator = 'HTMLTestRunner %s' % __version__
         stylesheet = self._generate_stylesheet()
         heading = self._generate_heading(result)
-        report = self._generate_report(result)
+        m_ElidedCases = self._get_elided_cases(result)
+        m_SidecarName = None
+        if m_ElidedCases is not None and self.elided_sidecar:
+            m_SidecarName = p_output + ".elided.jsonl.gz"
+        elif os.path.isfile(p_output + ".elided.jsonl.gz"):
+            # 本次没有省略的Case，删除以前生成的附属文件
+            os.remove(p_output + ".elided.jsonl.gz")
+        if result.getRunDiff() is None:
+            report = self._generate_report(result, m_ElidedCases, m_SidecarName)
+        else:
+            report = self._generate_diff(result)
+        regression = self._generate_regression(result)
+        clusters = self._generate_clusters(result)
         ending = self._generate_ending()
         chart1 = self._generate_chart1(result)
         chart2 = self._generate_chart2(result)
+        search_index = self._generate_search_index(result, m_ElidedCases)
+        trace_store = self._generate_trace_store(result, m_ElidedCases)
         output = self.HTML_TMPL % dict(
-            title=saxutils.escape(self.title),
+            title=EscapeText(self.title),
             generator=generator,
+            digest=self.DIGEST_PLACEHOLDER,
             stylesheet=stylesheet,
             heading=heading,
             report=report,
+            regression=regression,
+            clusters=clusters,
             ending=ending,
             chart_script1=chart1,
-            chart_script2=chart2
+            chart_script2=chart2,
+            search_index=search_index,
+            trace_store=trace_store,
         )
-        # 生成html文件
-        m_OutputHandler = open(p_output, "w", encoding='utf8')
-        m_OutputHandler.write(output)
-        m_OutputHandler.close()
-
-        # 复制需要的css和js文件
+        # 报告的内容是确定的，内容的摘要写在文件头中，内容没有变化时不重写文件
+        # 摘要中包括压缩级别，级别改变时同时重写.gz文件
+        m_Hash = hashlib.sha256(output.encode('utf8'))
+        m_Hash.update(("gzip=%s" % self.gzip_level).encode('utf8'))
+        m_Digest = m_Hash.hexdigest()
+        output = output.replace(self.DIGEST_PLACEHOLDER, m_Digest, 1)
+        if self.gzip_level is None and os.path.isfile(p_output + ".gz"):
+            # 以前用--gzip生成的.gz文件不会再更新，Web服务器会继续提供旧的报告，需要删除
+            os.remove(p_output + ".gz")
+        if self._read_report_digest(p_output) != m_Digest or \
+                (self.gzip_level is not None and not os.path.isfile(p_output + ".gz")):
+            # 先写入临时文件再改名，读者不会看到写了一半的文件
+            with self._atomic_open(p_output) as m_OutputHandler:
+                if self.gzip_level is None:
+                    m_OutputHandler.write(output)
+                else:
+                    # 需要时同时写入预压缩的.gz文件
+                    with self._atomic_open(p_output + ".gz", "wb") as m_GzipFile, \
+                            self._open_gzip(m_GzipFile, p_output) as m_GzipHandler:
+                        for m_nPos in range(0, len(output), self.WRITE_CHUNK_SIZE):
+                            m_Chunk = output[m_nPos:m_nPos + self.WRITE_CHUNK_SIZE]
+                            m_OutputHandler.write(m_Chunk)
+                            m_GzipHandler.write(m_Chunk.encode('utf8'))
+            if m_SidecarName is not None:
+                self._generate_elided_sidecar(result, m_ElidedCases, m_SidecarName)
+        elif m_SidecarName is not None and not os.path.isfile(m_SidecarName):
+            self._generate_elided_sidecar(result, m_ElidedCases, m_SidecarName)
+
+        # 复制需要的css和js文件，只复制有变化的文件
         m_csspath = os.path.abspath(os.path.join(os.path.dirname(__file__), "css"))
         m_jspath = os.path.abspath(os.path.join(os.path.dirname(__file__), "js"))
         m_new_csspath = os.path.abspath(os.path.join(os.path.dirname(p_output), "css"))
         m_new_jspath = os.path.abspath(os.path.join(os.path.dirname(p_output), "js"))
         if m_csspath != m_new_csspath:
-            if os.path.exists(m_new_csspath):
-                shutil.rmtree(m_new_csspath)
-            shutil.copytree(m_csspath, m_new_csspath)
+            self._sync_assets(m_csspath, m_new_csspath)
         if m_jspath != m_new_jspath:
-            if os.path.exists(m_new_jspath):
-                shutil.rmtree(m_new_jspath)
-            shutil.copytree(m_jspath, m_new_jspath)
+            self._sync_assets(m_jspath, m_new_jspath)
+        if self.gzip_level is not None:
+            self._compress_assets(m_new_csspath)
+            self._compress_assets(m_new_jspath)
+        else:
+            self._remove_compressed_assets(m_new_csspath)
+            self._remove_compressed_assets(m_new_jspath)
+
+    def generateSplitReports(self, result, p_output, p_SplitBy):
+        """
+        按照Owner或者Suite(p_SplitBy)把结果拆分为多个报告，每个报告有自己的图表，另外生成一个索引页
+        拆分后的报告和p_output在同一个目录下，共用一份css和js，返回索引页的文件名
+        """
+        m_Slices = SplitTestResult(result, p_SplitBy)
+        m_BaseName = os.path.splitext(p_output)[0]
+        m_FileNames = []
+        m_UsedFileNames = set()            # 小写的文件名，在不区分大小写的文件系统上也不能重名
+        m_Suffixes = {}                    # {文件名: 下一个尝试的序号}
+        for m_Name, _ in m_Slices:
+            m_FileName = m_BaseName + "-" + p_SplitBy + "-" + (re.sub(r'[^\w.-]+', '_', m_Name) or "_")
+            # 名称中的特殊字符替换以后可能重名，加上序号直到不重名为止
+            m_UniqueFileName = m_FileName
+            while m_UniqueFileName.lower() in m_UsedFileNames:
+                m_Suffixes[m_FileName.lower()] = m_Suffixes.get(m_FileName.lower(), 1) + 1
+                m_UniqueFileName = m_FileName + "-" + str(m_Suffixes[m_FileName.lower()])
+            m_UsedFileNames.add(m_UniqueFileName.lower())
+            m_FileNames.append(m_UniqueFileName + ".html")
+
+        # 每个报告单独生成，不再嵌套使用进程池
+        m_SliceRunner = copy.copy(self)
+        m_SliceRunner.workers = 1
+        if self.workers > 1 and len(m_Slices) > 1:
+            import concurrent.futures
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as m_Executor:
+                list(m_Executor.map(m_SliceRunner.generateReport,
+                                    [m_TestResult for _, m_TestResult in m_Slices], m_FileNames))
+        else:
+            for (_, m_TestResult), m_FileName in zip(m_Slices, m_FileNames):
+                m_SliceRunner.generateReport(result=m_TestResult, p_output=m_FileName)
+
+        m_Rows = []
+        for (m_Name, m_TestResult), m_FileName in zip(m_Slices, m_FileNames):
+            if m_TestResult.error_count > 0:
+                m_Style = "danger"
+            elif m_TestResult.fail_count > 0:
+                m_Style = "warning"
+            else:
+                m_Style = "success"
+            m_Rows.append(self.INDEX_ROW_TMPL % dict(
+                style=m_Style,
+                name=EscapeText(m_Name),
+                count=m_TestResult.pass_count + m_TestResult.fail_count + m_TestResult.error_count,
+                Pass=m_TestResult.pass_count,
+                fail=m_TestResult.fail_count,
+                error=m_TestResult.error_count,
+                starttime=m_TestResult.getTestStartTime(),
+                elapsedtime=self._format_wallclock(m_TestResult.getTestWallClockTime(),
+                                                   m_TestResult.getTestElapsedTime()),
+                elapsedtitle=self._format_parallelism(m_TestResult.getTestWallClockTime(),
+                                                      m_TestResult.getTestElapsedTime()),
+                link=EscapeText(os.path.basename(m_FileName)),
+            ))
+        m_IndexFileName = m_BaseName + "-index.html"
+        with self._atomic_open(m_IndexFileName) as m_OutputHandler:
+            m_OutputHandler.write(self.INDEX_TMPL % dict(
+                title=EscapeText(result.getTitle()),
+                generator='HTMLTestRunner %s' % __version__,
+                report=EscapeText(os.path.basename(p_output)),
+                split_name={"owner": "负责人", "suite": "测试套件"}[p_SplitBy],
+                slice_list=''.join(m_Rows),
+            ))
+        return m_IndexFileName
+
+    def generateJUnitXML(self, result, p_output):
+        """
+        根据汇总后的TestResult生成JUnit XML文件
+        """
+        m_StatusTag = {
+            TestCaseStatus.FAILURE: "failure",
+            TestCaseStatus.ERROR: "error",
+        }
+        with self._atomic_open(p_output) as m_OutputHandler:
+            m_OutputHandler.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            m_OutputHandler.write(
+                '<testsuites name=%s tests="%d" failures="%d" errors="%d" time="%s" generator="%s">\n' % (
+                    self._xml_attr(result.getTitle()),
+                    result.pass_count + result.fail_count + result.error_count,
+                    result.fail_count, result.error_count, result.getTestElapsedTime(), JUNIT_XML_GENERATOR))
+            for m_TestSuite in result.TestSuites:
+                m_OutputHandler.write(
+                    '  <testsuite name=%s tests="%d" failures="%d" errors="%d" skipped="0" time="%s" '
+                    'timestamp=%s>\n' % (
+                        self._xml_attr(m_TestSuite.getSuiteName()),
+                        len(m_TestSuite.TestCases), m_TestSuite.getFailedCaseCount(),
+                        m_TestSuite.getErrorCaseCount(), m_TestSuite.getSuiteElapsedTime(),
+                        self._xml_attr(m_TestSuite.getSuiteStartTime())))
+                for m_TestCase in m_TestSuite.TestCases:
+                    m_OutputHandler.write('    <testcase classname=%s name=%s time="%s">\n' % (
+                        self._xml_attr(m_TestSuite.getSuiteName()),
+                        self._xml_attr(m_TestCase.getCaseName()),
+                        m_TestCase.getCaseElapsedTime()))
+                    m_OutputHandler.write('      <properties>\n')
+                    for m_Name, m_Value in [("owner", m_TestCase.getCaseOwner()),
+                                            ("rti", m_TestCase.getCaseRTI()),
+                                            ("firstbadlabel", m_TestCase.getCaseFirstBadLabel()),
+                                            ("starttime", m_TestCase.getCaseStartTime()),
+                                            ("attempts", len(m_TestCase.getAttempts()))]:
+                        m_OutputHandler.write('        <property name="%s" value=%s/>\n' % (
+                            m_Name, self._xml_attr(m_Value)))
+                    m_OutputHandler.write('      </properties>\n')
+                    if m_TestCase.getCaseStatus() in m_StatusTag:
+                        m_OutputHandler.write('      <%s type="%s" message=%s>%s</%s>\n' % (
+                            m_StatusTag[m_TestCase.getCaseStatus()],
+                            m_TestCase.getCaseStatus().name,
+                            self._xml_attr("RTI: " + str(m_TestCase.getCaseRTI())),
+                            EscapeText(self._xml_text(m_TestCase.getErrorStackTrace())),
+                            m_StatusTag[m_TestCase.getCaseStatus()]))
+                    m_OutputHandler.write('    </testcase>\n')
+                m_OutputHandler.write('  </testsuite>\n')
+            m_OutputHandler.write('</testsuites>\n')
+
+    def generateJsonSummary(self, result, p_output):
+        """
+        根据汇总后的TestResult生成JSON格式的统计信息
+        """
+        m_Summary = {
+            "title": result.getTitle(),
+            "starttime": result.getTestStartTime(),
+            "elapsedtime": result.getTestElapsedTime(),
+            "wallclocktime": result.getTestWallClockTime(),
+            "total": result.pass_count + result.fail_count + result.error_count,
+            "pass": result.pass_count,
+            "fail": result.fail_count,
+            "error": result.error_count,
+            "flaky": result.flaky_count,
+            "suites": [],
+            "owners": [],
+            "failures": [],
+        }
+        for m_TestSuite in result.TestSuites:
+            m_Summary["suites"].append({
+                "name": m_TestSuite.getSuiteName(),
+                "total": len(m_TestSuite.TestCases),
+                "pass": m_TestSuite.getPassedCaseCount(),
+                "fail": m_TestSuite.getFailedCaseCount(),
+                "error": m_TestSuite.getErrorCaseCount(),
+                "flaky": m_TestSuite.getFlakyCaseCount(),
+                "starttime": m_TestSuite.getSuiteStartTime(),
+                "elapsedtime": m_TestSuite.getSuiteElapsedTime(),
+                "wallclocktime": m_TestSuite.getSuiteWallClockTime(),
+                "owners": m_TestSuite.getSuiteOwnerList(),
+            })
+            for m_TestCase in m_TestSuite.TestCases:
+                if m_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS:
+                    continue
+                m_Summary["failures"].append({
+                    "suite": m_TestSuite.getSuiteName(),
+                    "case": m_TestCase.getCaseName(),
+                    "status": m_TestCase.getCaseStatus().name,
+                    "owner": m_TestCase.getCaseOwner(),
+                    "rti": m_TestCase.getCaseRTI(),
+                    "firstbadlabel": m_TestCase.getCaseFirstBadLabel(),
+                    "fingerprint": m_TestCase.getCaseTraceFingerprint(),
+                    "attempts": len(m_TestCase.getAttempts()),
+                })
+        for m_User, m_Pass, m_Fail, m_Error in self._get_owner_statistics(result):
+            m_Summary["owners"].append({
+                "name": m_User,
+                "total": m_Pass + m_Fail + m_Error,
+                "pass": m_Pass,
+                "fail": m_Fail,
+                "error": m_Error,
+            })
+        with self._atomic_open(p_output) as m_OutputHandler:
+            json.dump(m_Summary, m_OutputHandler, ensure_ascii=False, separators=(',', ':'))
+
+    def generateMetrics(self, result, p_output):
+        """
+        根据汇总后的TestResult生成OpenMetrics格式的文本文件，供node exporter的textfile collector读取
+        """
+        lines = []
+
+        def add_metric(p_Name, p_Type, p_Help, p_Samples):
+            lines.append("# TYPE %s_%s %s" % (self.METRICS_PREFIX, p_Name, p_Type))
+            lines.append("# HELP %s_%s %s" % (self.METRICS_PREFIX, p_Name, p_Help))
+            for m_Suffix, m_Labels, m_Value in p_Samples:
+                lines.append("%s_%s%s%s %s" % (
+                    self.METRICS_PREFIX, p_Name, m_Suffix, self._metric_labels(m_Labels), m_Value))
+
+        add_metric("cases", "gauge", "Number of test cases by status.", [
+            ("", [("status", "pass")], result.pass_count),
+            ("", [("status", "fail")], result.fail_count),
+            ("", [("status", "error")], result.error_count),
+            ("", [("status", "flaky")], result.flaky_count),
+        ])
+        m_Samples = []
+        for m_TestSuite in result.TestSuites:
+            for m_Status, m_Count in [("pass", m_TestSuite.getPassedCaseCount()),
+                                      ("fail", m_TestSuite.getFailedCaseCount()),
+                                      ("error", m_TestSuite.getErrorCaseCount())]:
+                m_Samples.append(("", [("suite", m_TestSuite.getSuiteName()), ("status", m_Status)], m_Count))
+        add_metric("suite_cases", "gauge", "Number of test cases by suite and status.", m_Samples)
+        m_Samples = []
+        for m_User, m_Pass, m_Fail, m_Error in self._get_owner_statistics(result):
+            for m_Status, m_Count in [("pass", m_Pass), ("fail", m_Fail), ("error", m_Error)]:
+                m_Samples.append(("", [("owner", m_User), ("status", m_Status)], m_Count))
+        add_metric("owner_cases", "gauge", "Number of test cases by owner and status.", m_Samples)
+        add_metric("cumulative_seconds", "gauge", "Sum of the elapsed time of all test cases.", [
+            ("", [], result.getTestElapsedTime())])
+        if result.getTestWallClockTime() is not None:
+            add_metric("wallclock_seconds", "gauge", "Wall-clock time covered by test cases.", [
+                ("", [], "{:.3f}".format(result.getTestWallClockTime()))])
+
+        # 按照最近秩的方法计算Case运行时长的分位数
+        m_ElapsedTimes = sorted([int(m_TestCase.getCaseElapsedTime())
+                                 for m_TestSuite in result.TestSuites for m_TestCase in m_TestSuite.TestCases])
+        m_Samples = []
+        if len(m_ElapsedTimes) != 0:
+            for m_Quantile in self.METRICS_QUANTILES:
+                m_Rank = max(0, int(math.ceil(m_Quantile * len(m_ElapsedTimes))) - 1)
+                m_Samples.append(("", [("quantile", str(m_Quantile))], m_ElapsedTimes[m_Rank]))
+        m_Samples.append(("_sum", [], sum(m_ElapsedTimes)))
+        m_Samples.append(("_count", [], len(m_ElapsedTimes)))
+        add_metric("case_duration_seconds", "summary", "Elapsed time of test cases.", m_Samples)
+        add_metric("phase_seconds", "gauge", "Time spent in each report generation phase.", [
+            ("", [("phase", m_Phase)], "{:.3f}".format(m_Seconds)) for m_Phase, m_Seconds in result.getPhaseTimings()])
+        lines.append("# EOF")
+        with self._atomic_open(p_output) as m_OutputHandler:
+            m_OutputHandler.write("\n".join(lines) + "\n")
+
+    @staticmethod
+    def _metric_labels(p_Labels):
+        if len(p_Labels) == 0:
+            return ""
+        return "{" + ",".join(['%s="%s"' % (m_Name, str(m_Value).replace("\\", "\\\\").replace('"', '\\"')
+                                            .replace("\n", "\\n"))
+                               for m_Name, m_Value in p_Labels]) + "}"
+
+    @staticmethod
+    def _xml_text(p_Text):
+        # 去掉XML中不允许出现的控制字符
+        return XML_INVALID_CHARS.sub('', str(p_Text))
+
+    @classmethod
+    def _xml_attr(cls, p_Value):
+        from xml.sax import saxutils
+        return saxutils.quoteattr(cls._xml_text(p_Value))
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _atomic_open(p_FileName, p_Mode="w"):
+        """
+        在同一个目录下写入临时文件，完成后改名为目标文件；出错时删除临时文件，目标文件保持不变
+        """
+        import tempfile
+        m_Handle, m_TempFileName = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(p_FileName)), prefix="." + os.path.basename(p_FileName) + ".")
+        try:
+            if "b" in p_Mode:
+                m_File = os.fdopen(m_Handle, p_Mode)
+            else:
+                m_File = os.fdopen(m_Handle, p_Mode, encoding='utf8')
+            with m_File:
+                yield m_File
+            # mkstemp创建的文件只有所有者可读
+            os.chmod(m_TempFileName, 0o644)
+            os.replace(m_TempFileName, p_FileName)
+        except BaseException:
+            if os.path.exists(m_TempFileName):
+                os.remove(m_TempFileName)
+            raise
+
+    def _read_report_digest(self, p_FileName):
+        # 内容摘要在<head>的最前面，逐行读取，最多读到</head>为止
+        if not os.path.isfile(p_FileName):
+            return None
+        with open(p_FileName, "r", encoding='utf8', errors='replace') as m_File:
+            for m_Line in m_File:
+                m_Match = self.DIGEST_PATTERN.search(m_Line)
+                if m_Match is not None:
+                    return m_Match.group(1)
+                if "</head>" in m_Line:
+                    break
+        return None
+
+    def _sync_assets(self, p_SourcePath, p_TargetPath):
+        import filecmp
+        import shutil
+        if not os.path.isdir(p_TargetPath):
+            os.makedirs(p_TargetPath)
+        for m_FileName in os.listdir(p_SourcePath):
+            m_SourceFileName = os.path.join(p_SourcePath, m_FileName)
+            m_TargetFileName = os.path.join(p_TargetPath, m_FileName)
+            if not os.path.isfile(m_SourceFileName):
+                continue
+            # 大小和修改时间都相同的文件认为没有变化
+            if os.path.isfile(m_TargetFileName) and filecmp.cmp(m_SourceFileName, m_TargetFileName, shallow=True):
+                continue
+            with open(m_SourceFileName, "rb") as m_Source, self._atomic_open(m_TargetFileName, "wb") as m_Target:
+                shutil.copyfileobj(m_Source, m_Target, self.WRITE_CHUNK_SIZE)
+            shutil.copystat(m_SourceFileName, m_TargetFileName)
+
+    def _open_gzip(self, p_FileObject, p_FileName):
+        # mtime固定为0，相同的内容压缩后的文件也完全相同
+        import gzip
+        return gzip.GzipFile(filename=os.path.basename(p_FileName), mode="wb",
+                             compresslevel=self.gzip_level or self.DEFAULT_GZIP_LEVEL,
+                             fileobj=p_FileObject, mtime=0)
+
+    def _compress_assets(self, p_AssetPath):
+        import shutil
+        for m_FileName in os.listdir(p_AssetPath):
+            m_FileName = os.path.join(p_AssetPath, m_FileName)
+            if not os.path.isfile(m_FileName) or m_FileName.endswith(".gz"):
+                continue
+            # 已经存在并且比原文件新的.gz文件不需要重新压缩
+            if os.path.isfile(m_FileName + ".gz") and \
+                    os.path.getmtime(m_FileName + ".gz") >= os.path.getmtime(m_FileName):
+                continue
+            with open(m_FileName, "rb") as m_Source, \
+                    self._atomic_open(m_FileName + ".gz", "wb") as m_GzipFile, \
+                    self._open_gzip(m_GzipFile, m_FileName) as m_Target:
+                shutil.copyfileobj(m_Source, m_Target, self.WRITE_CHUNK_SIZE)
+
+    @staticmethod
+    def _remove_compressed_assets(p_AssetPath):
+        # 删除以前生成的.gz文件，避免原文件更新后仍然提供旧的压缩内容
+        for m_FileName in os.listdir(p_AssetPath):
+            m_FileName = os.path.join(p_AssetPath, m_FileName)
+            if m_FileName.endswith(".gz") and os.path.isfile(m_FileName[:-len(".gz")]):
+                os.remove(m_FileName)
 
     def _generate_stylesheet(self):
         return self.STYLESHEET_TMPL
@@ -885,68 +1870,290 @@ class HTMLTestRunner(HtmlFileTemplate):
         a_lines = []
         for name, value in report_attrs:
             line = self.HEADING_ATTRIBUTE_TMPL % dict(
-                name=saxutils.escape(name),
-                value=saxutils.escape(value),
+                name=EscapeText(name),
+                value=EscapeText(value),
             )
             a_lines.append(line)
         heading = self.HEADING_TMPL % dict(
-            title=saxutils.escape(result.getTitle()),
+            title=EscapeText(result.getTitle()),
             parameters=''.join(a_lines),
             # 对描述信息不进行转义，以保证其中的换行符显示
             description=result.getDescription(),
+            chart1_fallback=self._generate_chart1_fallback(result),
+            chart2_fallback=self._generate_chart2_fallback(result),
         )
         return heading
 
-    def _generate_report(self, result):
-        rows = []
+    def _generate_report(self, result, p_ElidedCases=None, p_SidecarName=None):
         nPos = 1
         for m_TestSuite in result.TestSuites:
             m_TestSuite.setSID(nPos)
             nPos = nPos + 1
-            if len(m_TestSuite.getSuiteDescription()) == 0:
-                desc = m_TestSuite.getSuiteName()
-            else:
-                desc = m_TestSuite.getSuiteDescription()
-
-            if m_TestSuite.getErrorCaseCount() > 0:
-                m_CSSStype = "errorClass"
-            elif m_TestSuite.getFailedCaseCount() > 0:
-                m_CSSStype = "failClass"
-            else:
-                m_CSSStype = "passClass"
-            m_TotalCaseCount = m_TestSuite.getPassedCaseCount() + \
-                               m_TestSuite.getFailedCaseCount() + \
-                               m_TestSuite.getErrorCaseCount()
-            row = self.REPORT_CLASS_TMPL % dict(
-                style=m_CSSStype,
-                desc=desc,
-                count=m_TotalCaseCount,
-                Pass=m_TestSuite.getPassedCaseCount(),
-                fail=m_TestSuite.getFailedCaseCount(),
-                error=m_TestSuite.getErrorCaseCount(),
-                owner=m_TestSuite.getSuiteOwnerList(),
-                starttime=m_TestSuite.getSuiteStartTime(),
-                elapsedtime=strftime("%H:%M:%S", gmtime(int(m_TestSuite.getSuiteElapsedTime()))),
-                firstbadlabel=m_TestSuite.getSuiteFirstBadLabel(),
-                cid="c" + str(m_TestSuite.getSID()),
-            )
-            rows.append(row)
-
-            # 生成Suite下面TestCase的详细内容
-            for m_TestCase in m_TestSuite.TestCases:
-                self._generate_report_test(rows, m_TestSuite.getSID(), m_TestCase)
+        if p_ElidedCases is None:
+            p_ElidedCases = [[] for _ in result.TestSuites]
+        m_SidecarLink = ""
+        if p_SidecarName is not None:
+            m_SidecarLink = self.REPORT_ELIDED_SIDECAR_TMPL % dict(sidecar=os.path.basename(p_SidecarName))
+        m_SidecarLinks = [m_SidecarLink] * len(result.TestSuites)
+
+        # 每个Suite的内容互相独立，可以在进程池中并行生成，按原有顺序拼接
+        if self.workers > 1 and len(result.TestSuites) > 1:
+            import concurrent.futures
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as m_Executor:
+                rows = list(m_Executor.map(
+                    self._generate_report_suite,
+                    [self._get_render_suite(m_TestSuite) for m_TestSuite in result.TestSuites],
+                    [[self._get_render_case(m_TestCase) for m_TestCase in m_ElidedCases]
+                     for m_ElidedCases in p_ElidedCases],
+                    m_SidecarLinks,
+                    chunksize=max(1, len(result.TestSuites) // (self.workers * 4))))
+        else:
+            rows = [self._generate_report_suite(m_TestSuite, m_ElidedCases, m_SidecarLink)
+                    for m_TestSuite, m_ElidedCases, m_SidecarLink in
+                    zip(result.TestSuites, p_ElidedCases, m_SidecarLinks)]
 
         report = self.REPORT_TMPL % dict(
+            search_box=self.SEARCH_BOX_TMPL if self.search_index else "",
             test_list=''.join(rows),
             count=str(result.pass_count + result.fail_count + result.error_count),
             Pass=str(result.pass_count),
             fail=str(result.fail_count),
             starttime=result.starttime,
-            elapsedtime=strftime("%H:%M:%S", gmtime(int(result.elapsedtime))),
+            elapsedtime=self._format_wallclock(result.getTestWallClockTime(), result.getTestElapsedTime()),
+            elapsedtitle=self._format_parallelism(result.getTestWallClockTime(), result.getTestElapsedTime()),
             error=str(result.error_count),
         )
         return report
 
+    @staticmethod
+    def _get_render_case(p_TestCase):
+        # 错误堆栈从trace_store中显示，生成Case行时不需要，不复制到进程池中
+        m_TestCase = copy.copy(p_TestCase)
+        m_TestCase.setErrorStackTrace("")
+        return m_TestCase
+
+    @classmethod
+    def _get_render_suite(cls, p_TestSuite):
+        # 只保留生成Suite内容需要的字段，减少发送到进程池的数据量
+        m_TestSuite = copy.copy(p_TestSuite)
+        m_TestSuite.SuiteIntervals = []
+        m_TestSuite.TestCases = [cls._get_render_case(m_TestCase) for m_TestCase in p_TestSuite.TestCases]
+        return m_TestSuite
+
+    @staticmethod
+    def _format_wallclock(p_WallClockTime, p_ElapsedTime):
+        # 无法得到实际运行时间时，显示累计的运行时间
+        if p_WallClockTime is None:
+            return strftime("%H:%M:%S", gmtime(int(p_ElapsedTime)))
+        return strftime("%H:%M:%S", gmtime(int(p_WallClockTime)))
+
+    @staticmethod
+    def _format_parallelism(p_WallClockTime, p_ElapsedTime):
+        m_Text = u"累计测试时长 " + strftime("%H:%M:%S", gmtime(int(p_ElapsedTime)))
+        if p_WallClockTime:
+            m_Text = m_Text + u"，并行度 " + "{:.2f}".format(int(p_ElapsedTime) / p_WallClockTime)
+        return m_Text
+
+    def _generate_regression(self, result):
+        m_RegressionList = result.getDurationRegressions()
+        if len(m_RegressionList) == 0:
+            return ""
+        # 按照Suite汇总，Suite的顺序和Case出现的顺序一致
+        m_SuiteSummary = {}
+        case_rows = []
+        for m_Regression in m_RegressionList:
+            if m_Regression.SuiteName not in m_SuiteSummary:
+                m_SuiteSummary[m_Regression.SuiteName] = [0, 0, 0]
+            m_Summary = m_SuiteSummary[m_Regression.SuiteName]
+            m_Summary[0] = m_Summary[0] + 1
+            m_Summary[1] = m_Summary[1] + m_Regression.BaselineElapsedTime
+            m_Summary[2] = m_Summary[2] + m_Regression.CurrentElapsedTime
+            m_Ratio = m_Regression.getRatio()
+            case_rows.append(self.REGRESSION_CASE_TMPL % dict(
+                suite=EscapeText(m_Regression.SuiteName),
+                case=EscapeText(m_Regression.CaseName),
+                owner=EscapeText(m_Regression.CaseOwner),
+                baseline=strftime("%H:%M:%S", gmtime(m_Regression.BaselineElapsedTime)),
+                current=strftime("%H:%M:%S", gmtime(m_Regression.CurrentElapsedTime)),
+                delta=strftime("%H:%M:%S", gmtime(m_Regression.getDelta())),
+                ratio="-----" if m_Ratio is None else "+{:.2f}%".format(m_Ratio * 100),
+            ))
+        suite_rows = []
+        for m_SuiteName, m_Summary in m_SuiteSummary.items():
+            suite_rows.append(self.REGRESSION_SUITE_TMPL % dict(
+                suite=EscapeText(m_SuiteName),
+                count=m_Summary[0],
+                baseline=strftime("%H:%M:%S", gmtime(m_Summary[1])),
+                current=strftime("%H:%M:%S", gmtime(m_Summary[2])),
+                delta=strftime("%H:%M:%S", gmtime(m_Summary[2] - m_Summary[1])),
+            ))
+        return self.REGRESSION_TMPL % dict(
+            suite_list=''.join(suite_rows),
+            case_list=''.join(case_rows),
+        )
+
+    def _generate_report_suite(self, p_TestSuite, p_ElidedCases=(), p_SidecarLink=""):
+        # 生成一个Suite的汇总行以及其下所有TestCase的内容，p_ElidedCases中的Case合并为一行
+        rows = []
+        if len(p_TestSuite.getSuiteDescription()) == 0:
+            desc = p_TestSuite.getSuiteName()
+        else:
+            desc = p_TestSuite.getSuiteDescription()
+
+        if p_TestSuite.getErrorCaseCount() > 0:
+            m_CSSStype = "errorClass"
+        elif p_TestSuite.getFailedCaseCount() > 0:
+            m_CSSStype = "failClass"
+        else:
+            m_CSSStype = "passClass"
+        m_TotalCaseCount = p_TestSuite.getPassedCaseCount() + \
+                           p_TestSuite.getFailedCaseCount() + \
+                           p_TestSuite.getErrorCaseCount()
+        row = self.REPORT_CLASS_TMPL % dict(
+            style=m_CSSStype,
+            desc=desc,
+            count=m_TotalCaseCount,
+            Pass=p_TestSuite.getPassedCaseCount(),
+            fail=p_TestSuite.getFailedCaseCount(),
+            error=p_TestSuite.getErrorCaseCount(),
+            owner=p_TestSuite.getSuiteOwnerList(),
+            starttime=p_TestSuite.getSuiteStartTime(),
+            elapsedtime=self._format_wallclock(p_TestSuite.getSuiteWallClockTime(), p_TestSuite.getSuiteElapsedTime()),
+            elapsedtitle=self._format_parallelism(p_TestSuite.getSuiteWallClockTime(),
+                                                  p_TestSuite.getSuiteElapsedTime()),
+            firstbadlabel=p_TestSuite.getSuiteFirstBadLabel(),
+            cid="c" + str(p_TestSuite.getSID()),
+            failed=p_TestSuite.getFailedCaseCount() + p_TestSuite.getErrorCaseCount(),
+        )
+        rows.append(row)
+
+        # 生成Suite下面TestCase的详细内容
+        # 在进程池中生成时Case会被复制，按照TID判断
+        m_ElidedSet = set([m_TestCase.getTID() for m_TestCase in p_ElidedCases])
+        for m_TestCase in p_TestSuite.TestCases:
+            if m_TestCase.getTID() not in m_ElidedSet:
+                self._generate_report_test(rows, p_TestSuite.getSID(), m_TestCase)
+        if len(p_ElidedCases) != 0:
+            m_OwnerList = []
+            for m_TestCase in p_ElidedCases:
+                if m_TestCase.getCaseOwner() not in m_OwnerList:
+                    m_OwnerList.append(m_TestCase.getCaseOwner())
+            rows.append(self.REPORT_ELIDED_TMPL % dict(
+                tid="et" + str(p_TestSuite.getSID()),
+                count=len(p_ElidedCases),
+                owner=','.join(m_OwnerList),
+                starttime=min([m_TestCase.getCaseStartTime() for m_TestCase in p_ElidedCases]),
+                elapsedtime=strftime("%H:%M:%S", gmtime(
+                    sum([int(m_TestCase.getCaseElapsedTime()) for m_TestCase in p_ElidedCases]))),
+                sidecar=p_SidecarLink or "&nbsp;",
+            ))
+        rows.append(self.REPORT_CLASS_END_TMPL)
+        return ''.join(rows)
+
+    def _get_elided_cases(self, result):
+        """
+        Case总数超出行数预算时，返回和result.TestSuites对应的被省略的Case列表，否则返回None
+        失败和错误的Case都单独显示，通过的Case中只单独显示运行时间最长的keep_slowest个
+        """
+        if self.row_budget is None or result.getRunDiff() is not None:
+            return None
+        if sum([len(m_TestSuite.TestCases) for m_TestSuite in result.TestSuites]) <= self.row_budget:
+            return None
+        # 运行时间相同时保留先出现的Case
+        m_SlowestCases = heapq.nlargest(
+            self.keep_slowest,
+            [m_TestCase for m_TestSuite in result.TestSuites for m_TestCase in m_TestSuite.TestCases
+             if m_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS],
+            key=lambda x: int(x.getCaseElapsedTime()))
+        m_KeepSet = set([id(m_TestCase) for m_TestCase in m_SlowestCases])
+        return [[m_TestCase for m_TestCase in m_TestSuite.TestCases
+                 if m_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS and id(m_TestCase) not in m_KeepSet]
+                for m_TestSuite in result.TestSuites]
+
+    def _generate_elided_sidecar(self, result, p_ElidedCases, p_SidecarName):
+        # 省略的Case按行写入压缩的jsonl文件，每行是一条和输入相同格式的记录，可以再用--datadir读取
+        with self._atomic_open(p_SidecarName, "wb") as m_SidecarFile, \
+                self._open_gzip(m_SidecarFile, p_SidecarName) as m_GzipHandler:
+            for m_TestSuite, m_ElidedCases in zip(result.TestSuites, p_ElidedCases):
+                m_Lines = []
+                for m_TestCase in m_ElidedCases:
+                    m_Lines.append(json.dumps(
+                        FormatTestResultRecord(m_TestSuite.getSuiteName(), m_TestCase), ensure_ascii=False) + "\n")
+                m_GzipHandler.write("".join(m_Lines).encode('utf8'))
+
+    def _generate_diff(self, result):
+        m_RunDiff = result.getRunDiff()
+        m_StatusText = {
+            TestCaseStatus.SUCCESS: u'通过',
+            TestCaseStatus.FAILURE: u'失败',
+            TestCaseStatus.ERROR: u'错误',
+        }
+        sections = []
+        for m_SectionTitle, m_DiffList in [
+            (u'新增失败', m_RunDiff.NewFailures),
+            (u'新增通过', m_RunDiff.NewPasses),
+            (u'持续失败', m_RunDiff.StillFailing),
+            (u'新增用例', m_RunDiff.AddedCases),
+            (u'消失用例', m_RunDiff.MissingCases),
+        ]:
+            if len(m_DiffList) == 0:
+                continue
+            rows = []
+            for m_PreviousCase, m_CurrentCase, m_SuiteName in m_DiffList:
+                # 消失的用例只有上次的记录
+                m_Case = m_PreviousCase if m_CurrentCase is None else m_CurrentCase
+                rows.append(self.DIFF_CASE_TMPL % dict(
+                    suite=EscapeText(m_SuiteName),
+                    case=EscapeText(m_Case.getCaseName()),
+                    owner=EscapeText(m_Case.getCaseOwner()),
+                    previous="--------" if m_PreviousCase is None else
+                    m_StatusText[m_PreviousCase.getCaseStatus()],
+                    current="--------" if m_CurrentCase is None else
+                    m_StatusText[m_CurrentCase.getCaseStatus()],
+                    rti=EscapeText(str(m_Case.getCaseRTI())),
+                    firstbadlabel=EscapeText(str(m_Case.getCaseFirstBadLabel())),
+                    link=m_Case.getDetailReportLink(),
+                ))
+            sections.append(self.DIFF_SECTION_TMPL % dict(
+                name=m_SectionTitle,
+                count=len(m_DiffList),
+                case_list=''.join(rows),
+            ))
+        if len(sections) == 0:
+            return self.DIFF_EMPTY_TMPL
+        return ''.join(sections)
+
+    def _generate_clusters(self, result):
+        # 按照指纹对失败的Case分组，只需要遍历一次
+        m_ClusterDict = {}
+        for m_TestSuite in result.TestSuites:
+            for m_TestCase in m_TestSuite.TestCases:
+                if m_TestCase.getCaseTraceFingerprint() == "":
+                    continue
+                if m_TestCase.getCaseTraceFingerprint() not in m_ClusterDict:
+                    m_ClusterDict[m_TestCase.getCaseTraceFingerprint()] = \
+                        [0, {}, [], m_TestCase.getErrorStackTraceID()]
+                m_Cluster = m_ClusterDict[m_TestCase.getCaseTraceFingerprint()]
+                m_Cluster[0] = m_Cluster[0] + 1
+                m_Cluster[1][m_TestCase.getCaseOwner()] = True
+                if len(m_Cluster[2]) < self.CLUSTER_SAMPLE_CASES:
+                    m_Cluster[2].append(m_TestSuite.getSuiteName() + " / " + str(m_TestCase.getCaseName()))
+        if len(m_ClusterDict) == 0:
+            return ""
+        rows = []
+        # 用例数多的聚类排在前面
+        for m_Fingerprint, m_Cluster in sorted(m_ClusterDict.items(), key=lambda x: -x[1][0]):
+            rows.append(self.CLUSTER_ROW_TMPL % dict(
+                fingerprint=m_Fingerprint,
+                count=m_Cluster[0],
+                owner=EscapeText(','.join(m_Cluster[1].keys())),
+                cases='<br>'.join([EscapeText(m_Case) for m_Case in m_Cluster[2]]),
+                trace_id=m_Cluster[3],
+            ))
+        return self.CLUSTER_TMPL % dict(
+            cluster_list=''.join(rows),
+        )
+
     def _generate_chart1(self, result):
         m_TotalCaseCount = result.pass_count + result.fail_count + result.error_count
         if m_TotalCaseCount == 0:
@@ -961,77 +2168,216 @@ class HTMLTestRunner(HtmlFileTemplate):
         )
         return chart
 
-    def _generate_chart2(self, result):
-        # 遍历所有的TestCase，获得TestCase的Owner列表
-        m_TestCaseOwnerList = []
+    def _get_owner_statistics(self, result):
+        """
+        返回每个Case Owner的统计信息列表 [(owner, pass, fail, error), ]，顺序和Owner第一次出现的顺序一致
+        """
+        if result.getOwnerStatistics() is not None:
+            return result.getOwnerStatistics()
+        m_OwnerStatistics = {}
         for m_TestSuite in result.TestSuites:
             for m_TestCase in m_TestSuite.TestCases:
-                if m_TestCase.getCaseOwner() not in m_TestCaseOwnerList:
-                    m_TestCaseOwnerList.append(m_TestCase.getCaseOwner())
-        # 循环获得用户列表
-        m_TestCaseOwnerParameter = ""
-        for m_User in m_TestCaseOwnerList:
-            if m_TestCaseOwnerParameter == "":
-                m_TestCaseOwnerParameter = "'" + m_User + "'"
-            else:
-                m_TestCaseOwnerParameter = m_TestCaseOwnerParameter + ",'" + m_User + "'"
-        # 循环获得用户各种情况测试案例的统计数据
-        m_TestCaseFailCountList = []
-        m_TestCaseErrorCountList = []
-        m_TestCasePassCountList = []
-        m_TestCaseOwnerFailParameter = ""
-        m_TestCaseOwnerErrorParameter = ""
-        m_TestCaseOwnerPassParameter = ""
-        for m_User in m_TestCaseOwnerList:
-            m_TestCaseFailCount = 0
-            m_TestCaseErrorCount = 0
-            m_TestCasePassCount = 0
+                if m_TestCase.getCaseOwner() not in m_OwnerStatistics:
+                    m_OwnerStatistics[m_TestCase.getCaseOwner()] = [0, 0, 0]
+                m_Counter = m_OwnerStatistics[m_TestCase.getCaseOwner()]
+                if m_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS:
+                    m_Counter[0] = m_Counter[0] + 1
+                if m_TestCase.getCaseStatus() == TestCaseStatus.FAILURE:
+                    m_Counter[1] = m_Counter[1] + 1
+                if m_TestCase.getCaseStatus() == TestCaseStatus.ERROR:
+                    m_Counter[2] = m_Counter[2] + 1
+        return [(m_User, m_Counter[0], m_Counter[1], m_Counter[2])
+                for m_User, m_Counter in m_OwnerStatistics.items()]
+
+    def _get_chart2_statistics(self, result):
+        """
+        返回负责人图表的数据 [(类别, pass, fail, error), ]，类别数量不超过chart_top_k(另加一个"其他")
+        """
+        if self.chart_group_by == "owner":
+            m_Statistics = self._get_owner_statistics(result)
+        else:
+            m_GroupStatistics = {}
             for m_TestSuite in result.TestSuites:
                 for m_TestCase in m_TestSuite.TestCases:
-                    if m_TestCase.getCaseOwner() == m_User:
-                        if m_TestCase.getCaseStatus() == TestCaseStatus.FAILURE:
-                            m_TestCaseFailCount = m_TestCaseFailCount + 1
-                        if m_TestCase.getCaseStatus() == TestCaseStatus.ERROR:
-                            m_TestCaseErrorCount = m_TestCaseErrorCount + 1
-                        if m_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS:
-                            m_TestCasePassCount = m_TestCasePassCount + 1
-            m_TestCaseFailCountList.append(m_TestCaseFailCount)
-            m_TestCaseErrorCountList.append(m_TestCaseErrorCount)
-            m_TestCasePassCountList.append(m_TestCasePassCount)
-        for m_Count in m_TestCaseFailCountList:
-            if m_TestCaseOwnerFailParameter == "":
-                m_TestCaseOwnerFailParameter = str(m_Count)
-            else:
-                m_TestCaseOwnerFailParameter = m_TestCaseOwnerFailParameter + "," + str(m_Count)
-        for m_Count in m_TestCaseErrorCountList:
-            if m_TestCaseOwnerErrorParameter == "":
-                m_TestCaseOwnerErrorParameter = str(m_Count)
-            else:
-                m_TestCaseOwnerErrorParameter = m_TestCaseOwnerErrorParameter + "," + str(m_Count)
-        for m_Count in m_TestCasePassCountList:
-            if m_TestCaseOwnerPassParameter == "":
-                m_TestCaseOwnerPassParameter = str(m_Count)
-            else:
-                m_TestCaseOwnerPassParameter = m_TestCaseOwnerPassParameter + "," + str(m_Count)
+                    if self.chart_group_by == "suite-owner":
+                        m_Group = m_TestSuite.getSuiteOwnerList()
+                    else:
+                        m_Group = self.team_map.get(m_TestCase.getCaseOwner(), m_TestCase.getCaseOwner())
+                    if m_Group not in m_GroupStatistics:
+                        m_GroupStatistics[m_Group] = [0, 0, 0]
+                    m_Counter = m_GroupStatistics[m_Group]
+                    if m_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS:
+                        m_Counter[0] = m_Counter[0] + 1
+                    if m_TestCase.getCaseStatus() == TestCaseStatus.FAILURE:
+                        m_Counter[1] = m_Counter[1] + 1
+                    if m_TestCase.getCaseStatus() == TestCaseStatus.ERROR:
+                        m_Counter[2] = m_Counter[2] + 1
+            m_Statistics = [(m_Group, m_Counter[0], m_Counter[1], m_Counter[2])
+                            for m_Group, m_Counter in m_GroupStatistics.items()]
+        if self.chart_top_k is None or len(m_Statistics) <= self.chart_top_k:
+            return m_Statistics
+
+        # 选出前K个类别，其余的合并到"其他"中
+        if self.chart_sort_by == "failures":
+            m_SortKey = lambda x: x[2]
+        elif self.chart_sort_by == "errors":
+            m_SortKey = lambda x: x[3]
+        else:
+            m_SortKey = lambda x: x[1] + x[2] + x[3]
+        m_TopStatistics = heapq.nlargest(self.chart_top_k, m_Statistics, key=m_SortKey)
+        m_TopGroups = set([m_Group for m_Group, _, _, _ in m_TopStatistics])
+        m_Others = [u"其他", 0, 0, 0]
+        for m_Group, m_Pass, m_Fail, m_Error in m_Statistics:
+            if m_Group not in m_TopGroups:
+                m_Others[1] = m_Others[1] + m_Pass
+                m_Others[2] = m_Others[2] + m_Fail
+                m_Others[3] = m_Others[3] + m_Error
+        return m_TopStatistics + [tuple(m_Others)]
+
+    def _generate_chart2(self, result):
+        m_OwnerStatistics = self._get_chart2_statistics(result)
         chart = self.ECHARTS_SCRIPT_2 % dict(
-            userlist=m_TestCaseOwnerParameter,
-            userdata_error=m_TestCaseOwnerErrorParameter,
-            userdata_fail=m_TestCaseOwnerFailParameter,
-            userdata_pass=m_TestCaseOwnerPassParameter,
+            userlist=','.join(["'" + m_User.replace("\\", "\\\\").replace("'", "\\'") + "'"
+                               for m_User, _, _, _ in m_OwnerStatistics]),
+            userdata_error=','.join([str(m_Error) for _, _, _, m_Error in m_OwnerStatistics]),
+            userdata_fail=','.join([str(m_Fail) for _, _, m_Fail, _ in m_OwnerStatistics]),
+            userdata_pass=','.join([str(m_Pass) for _, m_Pass, _, _ in m_OwnerStatistics]),
         )
         return chart
 
+    def _generate_chart1_fallback(self, result):
+        if not self.static_charts:
+            return ""
+        m_TotalCaseCount = result.pass_count + result.fail_count + result.error_count
+        m_Circumference = 2 * 3.14159 * 90
+        if m_TotalCaseCount == 0:
+            m_PassLen = m_FailLen = m_ErrorLen = 0
+            m_PassPercent = "-----"
+        else:
+            m_PassLen = m_Circumference * result.pass_count / m_TotalCaseCount
+            m_FailLen = m_Circumference * result.fail_count / m_TotalCaseCount
+            m_ErrorLen = m_Circumference * result.error_count / m_TotalCaseCount
+            m_PassPercent = str("{:.2f}".format(result.pass_count / m_TotalCaseCount * 100)) + "%"
+        return self.CHART1_SVG_TMPL % dict(
+            pass_len="{:.2f}".format(m_PassLen),
+            fail_len="{:.2f}".format(m_FailLen),
+            fail_offset="{:.2f}".format(m_PassLen),
+            error_len="{:.2f}".format(m_ErrorLen),
+            error_offset="{:.2f}".format(m_PassLen + m_FailLen),
+            circumference="{:.2f}".format(m_Circumference),
+            PassPercent=m_PassPercent,
+        )
+
+    def _generate_chart2_fallback(self, result):
+        if not self.static_charts:
+            return ""
+        m_OwnerStatistics = self._get_chart2_statistics(result)
+        m_MaxCount = max([m_Pass + m_Fail + m_Error for _, m_Pass, m_Fail, m_Error in m_OwnerStatistics] + [1])
+        m_Scale = 200 / m_MaxCount
+        bars = []
+        for m_nPos, (m_User, m_Pass, m_Fail, m_Error) in enumerate(m_OwnerStatistics):
+            m_Y = 5 + m_nPos * 20
+            bars.append(self.CHART2_SVG_BAR_TMPL % dict(
+                owner=EscapeText(m_User),
+                y=m_Y,
+                text_y=m_Y + 11,
+                error_len="{:.2f}".format(m_Error * m_Scale),
+                fail_x="{:.2f}".format(90 + m_Error * m_Scale),
+                fail_len="{:.2f}".format(m_Fail * m_Scale),
+                pass_x="{:.2f}".format(90 + (m_Error + m_Fail) * m_Scale),
+                pass_len="{:.2f}".format(m_Pass * m_Scale),
+            ))
+        return self.CHART2_SVG_TMPL % dict(
+            height=max(10 + len(m_OwnerStatistics) * 20, 300),
+            bars=''.join(bars),
+        )
+
+    def _generate_search_index(self, result, p_ElidedCases=None):
+        if not self.search_index or result.getRunDiff() is not None:
+            return ""
+        # 省略的Case在报告中没有对应的行，不放入索引
+        m_ElidedSet = set()
+        if p_ElidedCases is not None:
+            m_ElidedSet = set([id(m_TestCase) for m_ElidedList in p_ElidedCases for m_TestCase in m_ElidedList])
+        # 倒排索引： 关键字 -> 行号列表，行号指向search_rows中的tid
+        m_RowList = []
+        m_TokenIndex = {}
+        for m_TestSuite in result.TestSuites:
+            for m_TestCase in m_TestSuite.TestCases:
+                if id(m_TestCase) in m_ElidedSet:
+                    continue
+                m_RowNo = len(m_RowList)
+                m_RowList.append(self._get_case_tid(m_TestSuite.getSID(), m_TestCase))
+                m_Text = ' '.join([
+                    str(m_TestCase.getCaseName()),
+                    str(m_TestCase.getCaseDescription()),
+                    str(m_TestCase.getCaseOwner()),
+                    str(m_TestCase.getCaseRTI()),
+                    str(m_TestCase.getCaseFirstBadLabel()),
+                ])
+                for m_Token in set(self.SEARCH_TOKEN_PATTERN.findall(m_Text.lower())):
+                    if m_Token in m_TokenIndex:
+                        m_TokenIndex[m_Token].append(m_RowNo)
+                    else:
+                        m_TokenIndex[m_Token] = [m_RowNo]
+        m_TokenList = sorted(m_TokenIndex.keys())
+        return self.SEARCH_INDEX_TMPL % dict(
+            rows=self._to_script_json(m_RowList),
+            tokens=self._to_script_json(m_TokenList),
+            postings=self._to_script_json([m_TokenIndex[m_Token] for m_Token in m_TokenList]),
+        )
+
+    def _generate_trace_store(self, result, p_ElidedCases=None):
+        m_Traces = result.getTraceStore().Traces
+        if result.getRunDiff() is not None:
+            # 比较模式下没有Case行，只有失败聚类引用错误堆栈，聚类中第一个Case的堆栈作为代表
+            m_TraceIDs = {}
+            for m_TestSuite in result.TestSuites:
+                for m_TestCase in m_TestSuite.TestCases:
+                    if m_TestCase.getCaseTraceFingerprint() != "":
+                        m_TraceIDs.setdefault(m_TestCase.getCaseTraceFingerprint(), m_TestCase.getErrorStackTraceID())
+            m_TraceIDs = set(m_TraceIDs.values())
+            m_Traces = dict([(m_TraceID, m_Trace) for m_TraceID, m_Trace in m_Traces.items()
+                             if m_TraceID in m_TraceIDs])
+        elif p_ElidedCases is not None:
+            # 只保留报告中还有Case引用的错误堆栈
+            m_ElidedSet = set([id(m_TestCase) for m_ElidedList in p_ElidedCases for m_TestCase in m_ElidedList])
+            m_TraceIDs = set([m_TestCase.getErrorStackTraceID()
+                              for m_TestSuite in result.TestSuites for m_TestCase in m_TestSuite.TestCases
+                              if id(m_TestCase) not in m_ElidedSet])
+            m_Traces = dict([(m_TraceID, m_Trace) for m_TraceID, m_Trace in m_Traces.items()
+                             if m_TraceID in m_TraceIDs])
+        return self.TRACE_STORE_TMPL % dict(
+            traces=self._to_script_json(m_Traces),
+        )
+
+    @staticmethod
+    def _to_script_json(p_Object):
+        # 嵌入到<script>中的JSON，需要避免出现</script>和<!--
+        return json.dumps(p_Object, ensure_ascii=False, separators=(',', ':')).replace("<", "\\u003c")
+
+    @staticmethod
+    def _get_case_tid(cid, p_TestCase):
+        if p_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS:
+            return "pt" + str(cid) + "." + str(p_TestCase.getTID())
+        else:
+            return "ft" + str(cid) + "." + str(p_TestCase.getTID())
+
     def _generate_report_test(self, rows, cid, p_TestCase):
-        has_output = len(p_TestCase.getErrorStackTrace()) != 0
+        # 错误堆栈保存在trace_store中，有堆栈ID的Case才有详细信息
+        has_output = p_TestCase.getErrorStackTraceID() != ""
+        tid = self._get_case_tid(cid, p_TestCase)
         if p_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS:
-            tid = "pt" + str(cid) + "." + str(p_TestCase.getTID())
             m_Status = "通过"
         elif p_TestCase.getCaseStatus() == TestCaseStatus.FAILURE:
-            tid = "ft" + str(cid) + "." + str(p_TestCase.getTID())
             m_Status = "失败" + "(RTI: " + str(p_TestCase.getCaseRTI()) + ")"
         else:
-            tid = "ft" + str(cid) + "." + str(p_TestCase.getTID())
             m_Status = "错误" + "(RTI: " + str(p_TestCase.getCaseRTI()) + ")"
+        if len(p_TestCase.getAttempts()) > 1:
+            if p_TestCase.isFlaky():
+                m_Status = m_Status + "(不稳定，运行 %d 次)" % len(p_TestCase.getAttempts())
+            else:
+                m_Status = m_Status + "(运行 %d 次)" % len(p_TestCase.getAttempts())
         if has_output:
             m_Status = m_Status + "(点击查看详细信息)"
         if len(p_TestCase.getCaseDescription()) == 0:
@@ -1040,20 +2386,18 @@ class HTMLTestRunner(HtmlFileTemplate):
             desc = p_TestCase.getCaseDescription()
         tmpl = has_output and self.REPORT_TEST_WITH_OUTPUT_TMPL or self.REPORT_TEST_NO_OUTPUT_TMPL
 
-        script = self.REPORT_TEST_OUTPUT_TMPL % dict(
-            id=tid,
-            output=saxutils.escape(p_TestCase.getErrorStackTrace()),
-        )
-
         if p_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS:
             m_CSS_CaseStyle = "none"
+            m_CSS_RowClass = "caseRow passRow"
         elif p_TestCase.getCaseStatus() == TestCaseStatus.FAILURE:
             m_CSS_CaseStyle = "failCase"
+            m_CSS_RowClass = "caseRow failRow"
         else:
             m_CSS_CaseStyle = "errorCase"
+            m_CSS_RowClass = "caseRow failRow"
         row = tmpl % dict(
             tid=tid,
-            Class='hiddenRow',
+            Class=m_CSS_RowClass,
             style=m_CSS_CaseStyle,
             desc=desc,
             starttime=p_TestCase.getCaseStartTime(),
@@ -1061,7 +2405,7 @@ class HTMLTestRunner(HtmlFileTemplate):
             link=p_TestCase.getDetailReportLink(),
             download=p_TestCase.getDownloadURLLink(),
             firstbadlabel=p_TestCase.getCaseFirstBadLabel(),
-            script=script,
+            trace_id=p_TestCase.getErrorStackTraceID(),
             status=m_Status,
             owner=p_TestCase.getCaseOwner()
         )
@@ -1073,138 +2417,1079 @@ class HTMLTestRunner(HtmlFileTemplate):
         return self.ENDING_TMPL
 
 
-@click.command()
-@click.option("--version", is_flag=True, help="Display HtmlTestReport version.")
-@click.option("--title", type=str, help="Report title")
-@click.option("--datadir", type=str, required=True, help="Test result directory name or file name.")
-@click.option("--output", type=str, required=True, help="Output Html Report.")
-@click.option("--descfile", type=str, help="Test description")
-def GenerateHtmlTestReport(
-        version,
-        datadir,
-        output,
-        title,
-        descfile
-):
-    if version:
-        print("Version:", __version__)
-        sys.exit(0)
-
-    m_InputFileOrDirectory = datadir
-    m_InputDirectory = ""
-    m_TestResultList = []
-    if os.path.isfile(m_InputFileOrDirectory):
-        m_InputDirectory = os.path.dirname(m_InputFileOrDirectory)
+def GetInputDirectory(p_InputFileOrDirectory):
+    """
+    返回测试结果所在的目录，Trace文件的相对路径以这个目录为准
+    """
+    if os.path.isfile(p_InputFileOrDirectory):
+        return os.path.dirname(p_InputFileOrDirectory)
+    if os.path.isdir(p_InputFileOrDirectory):
+        return p_InputFileOrDirectory
+    return ""
+
+
+def ParseJUnitTime(p_Time):
+    """
+    把JUnit XML中的time(秒，可以有小数)转换为整秒
+    无法解析时原样返回，由ParseTestCase给出警告并忽略这个Case
+    """
+    try:
+        return str(int(float(p_Time or "0")))
+    except (ValueError, OverflowError):
+        return p_Time
+
+
+def OffsetJUnitTimestamp(p_Timestamp, p_Seconds):
+    """
+    返回JUnit XML中的开始时间p_Timestamp加上p_Seconds秒以后的时间，格式和原来相同
+    无法解析时原样返回
+    """
+    if p_Seconds == 0:
+        return p_Timestamp
+    try:
+        m_Timestamp = datetime.datetime.fromisoformat(p_Timestamp.strip())
+    except ValueError:
+        return p_Timestamp
+    m_Separator = "T" if "T" in p_Timestamp else " "
+    return (m_Timestamp + datetime.timedelta(seconds=p_Seconds)).isoformat(m_Separator)
+
+
+def IterJUnitXMLResultList(p_FileName, p_LoadFileName):
+    """
+    以流的方式读取JUnit XML文件，把testcase转换为和json文件相同格式的测试结果记录
+    处理完的testcase会从树中删除，内存占用和文件大小无关
+    """
+    from xml.etree import ElementTree
+    m_ElementStack = []
+    m_SuiteStack = []
+    try:
+        for m_Event, m_Element in ElementTree.iterparse(p_FileName, events=("start", "end")):
+            if m_Event == "start":
+                m_ElementStack.append(m_Element)
+                if m_Element.tag == "testsuite":
+                    # [Suite名称, Suite开始时间, 前面的Case累计运行的秒数]
+                    m_SuiteStack.append([m_Element.get("name", ""), m_Element.get("timestamp", ""), 0])
+                continue
+            m_ElementStack.pop()
+            if m_Element.tag == "testsuite":
+                m_SuiteStack.pop()
+                continue
+            if m_Element.tag != "testcase":
+                continue
+            m_ElapsedTime = ParseJUnitTime(m_Element.get("time", "0"))
+            m_StartTime = m_Element.get("timestamp")
+            if len(m_SuiteStack) != 0 and m_SuiteStack[-1][0] != "":
+                m_SuiteName = m_SuiteStack[-1][0]
+                if m_StartTime is None:
+                    # testcase通常没有自己的开始时间，Suite中的Case按顺序运行，
+                    # 开始时间为Suite的开始时间加上前面的Case累计运行的时间，否则运行区间会全部重叠
+                    m_StartTime = OffsetJUnitTimestamp(m_SuiteStack[-1][1], m_SuiteStack[-1][2])
+                    if m_ElapsedTime.isnumeric():
+                        m_SuiteStack[-1][2] = m_SuiteStack[-1][2] + int(m_ElapsedTime)
+            else:
+                m_SuiteName = m_Element.get("classname", p_LoadFileName)
+            m_TestResult = {
+                "SuiteName": m_SuiteName,
+                "CaseName": m_Element.get("name", ""),
+                "CaseStatus": "SUCCESS",
+                "CaseStartTime": m_StartTime or "",
+                "CaseElapsedTime": m_ElapsedTime,
+                "CaseReportLink": "",
+                "DownloadURLLink": "",
+                "load_filename": p_LoadFileName,
+            }
+            m_Skipped = False
+            m_TraceContent = []
+            for m_Child in m_Element:
+                if m_Child.tag in ("failure", "error"):
+                    m_TestResult["CaseStatus"] = m_Child.tag.upper()
+                    if m_Child.get("message"):
+                        m_TraceContent.append(m_Child.get("message"))
+                    if m_Child.text:
+                        m_TraceContent.append(m_Child.text.strip())
+                elif m_Child.tag == "skipped":
+                    m_Skipped = True
+                elif m_Child.tag in ("system-out", "system-err") and m_Child.text:
+                    # 和Trace文件一样，只保留前面一部分输出
+                    m_TraceContent.append(m_Child.text.strip()[:1024])
+                elif m_Child.tag == "properties":
+                    for m_Property in m_Child:
+                        if m_Property.get("name") == "owner":
+                            m_TestResult["CaseOwner"] = m_Property.get("value", "")
+                        elif m_Property.get("name") == "rti":
+                            m_TestResult["RTI"] = m_Property.get("value", "")
+                        elif m_Property.get("name") == "firstbadlabel":
+                            m_TestResult["Test_Label_FirstFailed"] = m_Property.get("value", "")
+            m_TestResult["CaseErrorStackTrace"] = "\n".join(m_TraceContent)
+            # 处理完的testcase从父节点中删除
+            if len(m_ElementStack) != 0:
+                del m_ElementStack[-1][:]
+            else:
+                m_Element.clear()
+            # 报告中没有跳过的状态，跳过的Case不记录
+            if not m_Skipped:
+                yield m_TestResult
+    except ElementTree.ParseError:
+        print("[WARNING] file [" + p_FileName + "] is a bad xml format, ignore the rest of it.")
+
+
+def IsGeneratedJUnitXML(p_FileName):
+    """
+    判断是否是--junit-xml生成的文件，只读取根节点
+    """
+    from xml.etree import ElementTree
+    try:
+        for _, m_Element in ElementTree.iterparse(p_FileName, events=("start",)):
+            return m_Element.get("generator") == JUNIT_XML_GENERATOR
+    except ElementTree.ParseError:
+        pass
+    return False
+
+
+def IterJsonLinesResultList(p_FileName, p_LoadFileName):
+    """
+    逐行读取jsonl文件，每行是一条和json文件相同格式的测试结果记录
+    """
+    with open(p_FileName, 'r') as load_f:
+        for m_LineNo, m_Line in enumerate(load_f, 1):
+            if not m_Line.strip():
+                continue
+            try:
+                m_TestResult = json.loads(m_Line)
+            except JSONDecodeError:
+                # 写入进程被中断时最后一行可能不完整
+                print("[WARNING] line " + str(m_LineNo) + " of file [" + p_FileName +
+                      "] is a bad json format, ignore it.")
+                continue
+            if not isinstance(m_TestResult, dict):
+                continue
+            m_TestResult["load_filename"] = p_LoadFileName
+            yield m_TestResult
+
+
+def IterJsonResultList(p_FileName, p_LoadFileName):
+    """
+    读取json文件，文件内容是测试结果记录的列表
+    其他格式的json文件(例如--json-summary生成的统计信息)会被忽略
+    """
+    with open(p_FileName, 'r') as load_f:
+        try:
+            m_TestResults = json.load(load_f)
+        except JSONDecodeError:
+            print("[WARNING] file [" + p_FileName + "] is a bad json format, ignore it.")
+            return
+    if not isinstance(m_TestResults, list):
+        print("[WARNING] file [" + p_FileName + "] is not a list of test results, ignore it.")
+        return
+    for m_TestResult in m_TestResults:
+        if not isinstance(m_TestResult, dict):
+            continue
+        m_TestResult["load_filename"] = p_LoadFileName
+        yield m_TestResult
+
+
+def IterTestResultList(p_InputFileOrDirectory):
+    """
+    逐个文件读取测试结果，参数可以是一个json、jsonl或JUnit XML文件，也可以是包含这些文件的目录
+    每次只有一个文件的内容在内存中，jsonl和JUnit XML文件以流的方式读取
+    目录中由--junit-xml生成的XML文件会被跳过，否则同一个Case会被重复读入，需要时可以直接指定文件名
+    """
+    if os.path.isfile(p_InputFileOrDirectory) and p_InputFileOrDirectory.endswith(".xml"):
+        for m_TestResult in IterJUnitXMLResultList(p_InputFileOrDirectory, str(p_InputFileOrDirectory)):
+            yield m_TestResult
+    if os.path.isfile(p_InputFileOrDirectory) and p_InputFileOrDirectory.endswith(".jsonl"):
+        for m_TestResult in IterJsonLinesResultList(p_InputFileOrDirectory, str(p_InputFileOrDirectory)):
+            yield m_TestResult
+    if os.path.isfile(p_InputFileOrDirectory):
         # 参数是一个文件
-        if m_InputFileOrDirectory.endswith(".json"):
-            with open(m_InputFileOrDirectory, 'r') as load_f:
-                try:
-                    m_TestResults = json.load(load_f)
-                    for m_TestResult in m_TestResults:
-                        m_TestResult["load_filename"] = str(m_InputFileOrDirectory)
-                        m_TestResultList.append(m_TestResult)
-                except JSONDecodeError:
-                    print("[WARNING] file [" + m_InputFileOrDirectory + "] is a bad json format, ignore it.")
-    if os.path.isdir(m_InputFileOrDirectory):
-        m_InputDirectory = m_InputFileOrDirectory
+        if p_InputFileOrDirectory.endswith(".json"):
+            for m_TestResult in IterJsonResultList(p_InputFileOrDirectory, str(p_InputFileOrDirectory)):
+                yield m_TestResult
+    if os.path.isdir(p_InputFileOrDirectory):
         # 遍历这个目录下的所有文件
-        filelist = os.listdir(m_InputFileOrDirectory)
+        filelist = os.listdir(p_InputFileOrDirectory)
         for file in filelist:
-            newfile = os.path.join(m_InputFileOrDirectory, file)
+            newfile = os.path.join(p_InputFileOrDirectory, file)
+            if os.path.isfile(newfile) and newfile.endswith(".xml"):
+                if IsGeneratedJUnitXML(newfile):
+                    print("[WARNING] file [" + newfile + "] is generated by --junit-xml, ignore it.")
+                    continue
+                for m_TestResult in IterJUnitXMLResultList(newfile, str(file)):
+                    yield m_TestResult
+            if os.path.isfile(newfile) and newfile.endswith(".jsonl"):
+                for m_TestResult in IterJsonLinesResultList(newfile, str(file)):
+                    yield m_TestResult
             if os.path.isfile(newfile) and newfile.endswith(".json"):
-                with open(newfile, 'r') as load_f:
-                    try:
-                        m_TestResults = json.load(load_f)
-                        for m_TestResult in m_TestResults:
-                            m_TestResult["load_filename"] = str(file)
-                            m_TestResultList.append(m_TestResult)
-                    except JSONDecodeError:
-                        print("[WARNING] file [" + newfile + "] is a bad json format, ignore it.")
-
-    # 循环处理TestCase信息
-    m_SuiteDict = {}
-    for m_TestResult in m_TestResultList:
-        if m_TestResult["SuiteName"] in m_SuiteDict.keys():
-            m_TestSuite = m_SuiteDict[m_TestResult["SuiteName"]]
-        else:
-            m_TestSuite = TestSuite()
-            m_TestSuite.setSuiteName(m_TestResult["SuiteName"])
-        m_TestCase = TestCase()
-        m_TestCase.setCaseName(m_TestResult["CaseName"])
-        if "CaseOwner" in m_TestResult.keys():
-            m_TestCase.setCaseOwner(m_TestResult["CaseOwner"])
-        else:
-            m_TestCase.setCaseOwner("UNKNOWN")
-        # Regression Tracking ID
-        if "RTI" in m_TestResult.keys():
-            m_TestCase.setCaseRTI(m_TestResult["RTI"])
-        else:
-            m_TestCase.setCaseRTI("UNKNOWN")
-        if "Test_Label_FirstFailed" in m_TestResult.keys():
-            m_TestCase.setCaseFirstBadLabel(m_TestResult["Test_Label_FirstFailed"])
-        else:
-            m_TestCase.setCaseFirstBadLabel("UNKNOWN")
-        # Case的运行状态
-        if m_TestResult["CaseStatus"].strip().upper() == "SUCCESS":
-            m_TestCase.setCaseStatus(TestCaseStatus.SUCCESS)
-        elif m_TestResult["CaseStatus"].strip().upper() == "FAILURE":
-            m_TestCase.setCaseStatus(TestCaseStatus.FAILURE)
-        elif m_TestResult["CaseStatus"].strip().upper() == "ERROR":
-            m_TestCase.setCaseStatus(TestCaseStatus.ERROR)
+                for m_TestResult in IterJsonResultList(newfile, str(file)):
+                    yield m_TestResult
+
+
+def ParseCaseStartTime(p_CaseStartTime):
+    """
+    把CaseStartTime解析为时间戳(秒)，无法解析时返回None
+    """
+    try:
+        return datetime.datetime.fromisoformat(str(p_CaseStartTime).strip()).timestamp()
+    except ValueError:
+        return None
+
+
+def UnionIntervals(p_Intervals):
+    """
+    合并互相重叠的区间，返回按开始时间排序且互不重叠的区间列表，复杂度O(n log n)
+    """
+    m_Union = []
+    for m_Start, m_End in sorted(p_Intervals):
+        if len(m_Union) != 0 and m_Start <= m_Union[-1][1]:
+            if m_End > m_Union[-1][1]:
+                m_Union[-1][1] = m_End
         else:
-            print("[WARNING] case [" + m_TestResult["CaseName"] +
-                  "] in [" + m_TestResult["load_filename"] + "] has invalid case status [" +
-                  m_TestResult["CaseStatus"] + "]")
+            m_Union.append([m_Start, m_End])
+    return m_Union
+
+
+def NormalizeStackTrace(p_StackTrace):
+    """
+    屏蔽错误堆栈中的时间、地址、路径和数字，使同一个问题产生的堆栈规范化后完全相同
+    """
+    m_StackTrace = p_StackTrace.strip()
+    for m_Pattern, m_Mask in STACK_TRACE_MASKS:
+        m_StackTrace = m_Pattern.sub(m_Mask, m_StackTrace)
+    return m_StackTrace
+
+
+def FingerprintStackTrace(p_StackTrace):
+    """
+    返回规范化后错误堆栈的指纹
+    """
+    return hashlib.sha1(NormalizeStackTrace(p_StackTrace).encode('utf-8')).hexdigest()[:12]
+
+
+def ParseTestCase(p_TestResult, p_InputDirectory, p_TraceStore=None):
+    """
+    把一条测试结果记录转换为TestCase，记录无效时返回None
+    指定了TraceStore时，错误堆栈按内容保存到其中
+    """
+    m_TestCase = TestCase()
+    m_TestCase.setCaseName(p_TestResult["CaseName"])
+    if "CaseOwner" in p_TestResult.keys():
+        m_TestCase.setCaseOwner(p_TestResult["CaseOwner"])
+    else:
+        m_TestCase.setCaseOwner("UNKNOWN")
+    # Regression Tracking ID
+    if "RTI" in p_TestResult.keys():
+        m_TestCase.setCaseRTI(p_TestResult["RTI"])
+    else:
+        m_TestCase.setCaseRTI("UNKNOWN")
+    if "Test_Label_FirstFailed" in p_TestResult.keys():
+        m_TestCase.setCaseFirstBadLabel(p_TestResult["Test_Label_FirstFailed"])
+    else:
+        m_TestCase.setCaseFirstBadLabel("UNKNOWN")
+    # Case的运行状态
+    if p_TestResult["CaseStatus"].strip().upper() == "SUCCESS":
+        m_TestCase.setCaseStatus(TestCaseStatus.SUCCESS)
+    elif p_TestResult["CaseStatus"].strip().upper() == "FAILURE":
+        m_TestCase.setCaseStatus(TestCaseStatus.FAILURE)
+    elif p_TestResult["CaseStatus"].strip().upper() == "ERROR":
+        m_TestCase.setCaseStatus(TestCaseStatus.ERROR)
+    else:
+        print("[WARNING] case [" + p_TestResult["CaseName"] +
+              "] in [" + p_TestResult["load_filename"] + "] has invalid case status [" +
+              p_TestResult["CaseStatus"] + "]")
+        return None
+    m_TraceContent = ""
+    if "CaseErrorStackTrace" in p_TestResult.keys():
+        if p_TestResult["CaseErrorStackTrace"] != "":
+            m_TraceContent = p_TestResult["CaseErrorStackTrace"]
+    if "CaseErrorStackTraceFile" in p_TestResult.keys():
+        if p_TestResult["CaseErrorStackTraceFile"] != "":
+            # 从Trace文件中读取内容，并填写进入报告
+            m_TraceFileName = os.path.join(p_InputDirectory, p_TestResult["CaseErrorStackTraceFile"])
+            if os.path.isfile(m_TraceFileName):
+                with open(m_TraceFileName, 'r') as load_f:
+                    m_TraceContent = m_TraceContent + "\n" + load_f.read(1024)
+    m_TestCase.setErrorStackTrace(m_TraceContent)
+    m_TestCase.setDetailReportLink(p_TestResult["CaseReportLink"])
+    m_TestCase.setDownloadURLLink(p_TestResult["DownloadURLLink"])
+    m_TestCase.setCaseStartTime(p_TestResult["CaseStartTime"])
+    m_ElapsedTime = str(p_TestResult["CaseElapsedTime"])
+    if m_ElapsedTime.isnumeric():
+        m_TestCase.setCaseElapsedTime(m_ElapsedTime)
+    else:
+        print("[WARNING] case [" + p_TestResult["CaseName"] +
+              "] in [" + p_TestResult["load_filename"] + "] has invalid CaseElapsedTime [" +
+              p_TestResult["CaseElapsedTime"] + "]")
+        return None
+    m_TestCase.setAttempts([(m_TestCase.getCaseStartTime(), m_TestCase.getCaseStatus().name)])
+    # 失败的Case计算错误堆栈的指纹
+    if m_TestCase.getCaseStatus() != TestCaseStatus.SUCCESS and m_TraceContent.strip() != "":
+        m_TestCase.setCaseTraceFingerprint(FingerprintStackTrace(m_TraceContent))
+    if p_TraceStore is not None:
+        p_TraceStore.intern(m_TestCase)
+    return m_TestCase
+
+
+def FormatTestResultRecord(p_SuiteName, p_TestCase):
+    """
+    ParseTestCase的逆过程，把TestCase转换为和json文件相同格式的测试结果记录
+    """
+    return {
+        "SuiteName": p_SuiteName,
+        "CaseName": p_TestCase.getCaseName(),
+        "CaseOwner": p_TestCase.getCaseOwner(),
+        "CaseStatus": p_TestCase.getCaseStatus().name,
+        "CaseStartTime": p_TestCase.getCaseStartTime(),
+        "CaseElapsedTime": str(p_TestCase.getCaseElapsedTime()),
+        "CaseErrorStackTrace": p_TestCase.getErrorStackTrace(),
+        "CaseReportLink": p_TestCase.getDetailReportLink(),
+        "DownloadURLLink": p_TestCase.getDownloadURLLink(),
+        "RTI": p_TestCase.getCaseRTI(),
+        "Test_Label_FirstFailed": p_TestCase.getCaseFirstBadLabel(),
+    }
+
+
+def SummaryTestResult(p_SuiteDict, p_TraceStore):
+    """
+    根据 {SuiteName: [TestCase, ]} 生成TestResult，并完成Suite和整体的汇总统计
+    """
+    m_TestResult = TestResult()
+    m_TestResult.setTraceStore(p_TraceStore)
+    for m_SuiteName, m_TestCaseList in p_SuiteDict.items():
+        m_TestSuite = TestSuite()
+        m_TestSuite.setSuiteName(m_SuiteName)
+        for m_TestCase in m_TestCaseList:
+            m_TestSuite.addTestCase(m_TestCase)
+        # 记录Case的汇总信息
+        m_TestSuite.SummaryTestCase()
+        m_TestResult.addSuite(m_TestSuite)
+    return m_TestResult
+
+
+def BuildTestResult(p_TestResultList, p_InputDirectory):
+    """
+    把测试结果记录合成为TestResult，同一个Case出现多次的，以最新的为准
+    """
+    # {SuiteName: {CaseName: TestCase}}，用Hash索引查找重复出现的Case
+    m_SuiteDict = {}
+    m_TraceStore = TraceStore()
+    for m_TestResult in p_TestResultList:
+        m_TestCase = ParseTestCase(m_TestResult, p_InputDirectory, m_TraceStore)
+        if m_TestCase is None:
             continue
-        m_TraceContent = ""
-        if "CaseErrorStackTrace" in m_TestResult.keys():
-            if m_TestResult["CaseErrorStackTrace"] != "":
-                m_TraceContent = m_TestResult["CaseErrorStackTrace"]
-        if "CaseErrorStackTraceFile" in m_TestResult.keys():
-            if m_TestResult["CaseErrorStackTraceFile"] != "":
-                # 从Trace文件中读取内容，并填写进入报告
-                m_TraceFileName = os.path.join(m_InputDirectory, m_TestResult["CaseErrorStackTraceFile"])
-                if os.path.isfile(m_TraceFileName):
-                    with open(m_TraceFileName, 'r') as load_f:
-                        m_TraceContent = m_TraceContent + "\n" + load_f.read(1024)
-        m_TestCase.setErrorStackTrace(m_TraceContent)
-        m_TestCase.setDetailReportLink(m_TestResult["CaseReportLink"])
-        m_TestCase.setDownloadURLLink(m_TestResult["DownloadURLLink"])
-        m_TestCase.setCaseStartTime(m_TestResult["CaseStartTime"])
-        m_ElapsedTime = str(m_TestResult["CaseElapsedTime"])
-        if m_ElapsedTime.isnumeric():
-            m_TestCase.setCaseElapsedTime(m_ElapsedTime)
+        FoldTestCase(m_SuiteDict, m_TestResult["SuiteName"], m_TestCase)
+    return SummaryFoldedTestCases(m_SuiteDict)
+
+
+def FoldTestCase(p_SuiteDict, p_SuiteName, p_TestCase):
+    """
+    把TestCase合并到 {SuiteName: {CaseName: TestCase}} 中
+    同一个Case出现多次的，以最新的为准，但保留所有的运行记录
+    """
+    if p_SuiteName not in p_SuiteDict:
+        p_SuiteDict[p_SuiteName] = {}
+    m_CaseDict = p_SuiteDict[p_SuiteName]
+
+    # 检查Case是否已经重新出现在Suite中
+    m_OldTestCase = m_CaseDict.get(p_TestCase.getCaseName())
+    if m_OldTestCase is not None:
+        if m_OldTestCase.getCaseStartTime() <= p_TestCase.getCaseStartTime():
+            # 存在该记录，且日期比较旧，放弃之前旧记录
+            p_TestCase.mergeAttempts(m_OldTestCase.getAttempts())
+            del m_CaseDict[p_TestCase.getCaseName()]
         else:
-            print("[WARNING] case [" + m_TestResult["CaseName"] +
-                  "] in [" + m_TestResult["load_filename"] + "] has invalid CaseElapsedTime [" +
-                  m_TestResult["CaseElapsedTime"] + "]")
-            continue
+            # 存在该记录，且日期比较新，放弃之前新记录
+            m_OldTestCase.mergeAttempts(p_TestCase.getAttempts())
+            return
+    m_CaseDict[p_TestCase.getCaseName()] = p_TestCase
 
-        # 检查Case是否已经重新出现在Suite中，如果有，以最新的为准
-        m_bFoundOldResult = False
-        for m_nPos in range(0, len(m_TestSuite.TestCases)):
-            if m_TestSuite.TestCases[m_nPos].getCaseName() == m_TestCase.getCaseName():
-                if m_TestSuite.TestCases[m_nPos].getCaseStartTime() <= m_TestCase.getCaseStartTime():
-                    # 存在该记录，且日期比较旧，放弃之前旧记录
-                    m_TestSuite.TestCases.pop(m_nPos)
-                    break
-                else:
-                    # 存在该记录，且日期比较新，放弃之前新记录
-                    m_bFoundOldResult = True
-                    break
-        if not m_bFoundOldResult:
-            m_TestSuite.addTestCase(m_TestCase)
 
-        # 记录Suite信息
-        m_SuiteDict[m_TestResult["SuiteName"]] = copy.copy(m_TestSuite)
+def SummaryFoldedTestCases(p_SuiteDict):
+    """
+    根据FoldTestCase合并后的 {SuiteName: {CaseName: TestCase}} 生成TestResult
+    """
+    # 被替换掉的旧记录的错误堆栈可能还留在TraceStore中，只保留最终用到的
+    m_UsedTraceStore = TraceStore()
+    for m_CaseDict in p_SuiteDict.values():
+        for m_TestCase in m_CaseDict.values():
+            m_UsedTraceStore.intern(m_TestCase)
+    return SummaryTestResult(
+        dict([(m_SuiteName, list(m_CaseDict.values())) for m_SuiteName, m_CaseDict in p_SuiteDict.items()]),
+        m_UsedTraceStore)
+
+
+def _SpillTestCaseRun(p_RunList, p_SpillDirectory, p_Records):
+    # 排序后写入一个磁盘上的有序段，排序是稳定的，相同键的记录保持读入的先后顺序
+    p_Records.sort(key=lambda x: x[0])
+    m_RunFileName = os.path.join(p_SpillDirectory, "run_%06d.jsonl" % len(p_RunList))
+    with open(m_RunFileName, 'w', encoding='utf-8') as m_RunFile:
+        for _, m_Line in p_Records:
+            m_RunFile.write(m_Line)
+    p_RunList.append(m_RunFileName)
+
+
+def _IterTestCaseRun(p_RunFileName):
+    with open(p_RunFileName, 'r', encoding='utf-8') as m_RunFile:
+        for m_Line in m_RunFile:
+            m_Record = json.loads(m_Line)
+            yield (m_Record["SuiteName"], m_Record["CaseName"], m_Record["CaseStartTime"]), m_Line
+
+
+def _MergeTestCaseRuns(p_RunList, p_SpillDirectory):
+    # 有序段太多时分多轮合并，避免同时打开过多的文件
+    m_RunList = list(p_RunList)
+    m_MergeRound = 0
+    while len(m_RunList) > MAX_MERGE_FANIN:
+        m_MergedRunFileName = os.path.join(p_SpillDirectory, "merge_%06d.jsonl" % m_MergeRound)
+        m_MergeRound = m_MergeRound + 1
+        with open(m_MergedRunFileName, 'w', encoding='utf-8') as m_MergedRunFile:
+            for _, m_Line in heapq.merge(*[_IterTestCaseRun(m_RunFileName)
+                                           for m_RunFileName in m_RunList[:MAX_MERGE_FANIN]],
+                                         key=lambda x: x[0]):
+                m_MergedRunFile.write(m_Line)
+        for m_RunFileName in m_RunList[:MAX_MERGE_FANIN]:
+            os.remove(m_RunFileName)
+        # heapq.merge对相同的键按段的先后顺序输出，合并后的段包含最早写入的记录，要放回最前面
+        m_RunList = [m_MergedRunFileName] + m_RunList[MAX_MERGE_FANIN:]
+    return heapq.merge(*[_IterTestCaseRun(m_RunFileName) for m_RunFileName in m_RunList], key=lambda x: x[0])
+
+
+def _ReduceTestCaseGroup(p_SuiteDict, p_TraceStore, p_SuiteName, p_Line, p_Attempts):
+    m_TestCase = TestCase.fromDict(json.loads(p_Line))
+    m_TestCase.mergeAttempts(p_Attempts)
+    p_TraceStore.intern(m_TestCase)
+    p_SuiteDict.setdefault(p_SuiteName, []).append(m_TestCase)
+
+
+def BuildTestResultExternal(p_TestResultList, p_InputDirectory, p_MemoryBudget, p_SpillDirectory=None):
+    """
+    外存模式的BuildTestResult，用于重复记录太多，无法全部放在内存中的情况
+    规范化后的记录超过内存预算(字节数，按序列化后的大小估算)时，排序后写入磁盘上的有序段，
+    最后按 (SuiteName, CaseName, CaseStartTime) 多路归并，每个Case只保留最新的一条
+    Suite和Case按照名称排序
+    """
+    import tempfile
+    m_RunList = []
+    with tempfile.TemporaryDirectory(prefix="HtmlTestReport_", dir=p_SpillDirectory) as m_SpillDirectory:
+        m_Records = []
+        m_RecordsSize = 0
+        for m_TestResult in p_TestResultList:
+            m_TestCase = ParseTestCase(m_TestResult, p_InputDirectory)
+            if m_TestCase is None:
+                continue
+            m_Record = m_TestCase.toDict()
+            m_Record["SuiteName"] = m_TestResult["SuiteName"]
+            m_Line = json.dumps(m_Record, ensure_ascii=False) + "\n"
+            m_Records.append(((m_Record["SuiteName"], m_Record["CaseName"], m_Record["CaseStartTime"]), m_Line))
+            m_RecordsSize = m_RecordsSize + len(m_Line)
+            if m_RecordsSize > p_MemoryBudget:
+                _SpillTestCaseRun(m_RunList, m_SpillDirectory, m_Records)
+                m_Records = []
+                m_RecordsSize = 0
+        if len(m_Records) != 0:
+            _SpillTestCaseRun(m_RunList, m_SpillDirectory, m_Records)
+            m_Records = []
+
+        # 归并后的记录按(SuiteName, CaseName)分组，同组中最后一条就是最新的记录
+        # 同组中所有记录的运行状态都保留在Attempts中
+        m_SuiteDict = {}
+        m_TraceStore = TraceStore()
+        m_LastKey = None
+        m_LastLine = None
+        m_Attempts = []
+        for m_Key, m_Line in _MergeTestCaseRuns(m_RunList, m_SpillDirectory):
+            if m_LastKey is not None and m_LastKey[:2] != m_Key[:2]:
+                _ReduceTestCaseGroup(m_SuiteDict, m_TraceStore, m_LastKey[0], m_LastLine, m_Attempts)
+                m_Attempts = []
+            m_Attempts.append((m_Key[2], json.loads(m_Line)["CaseStatus"]))
+            m_LastKey = m_Key
+            m_LastLine = m_Line
+        if m_LastKey is not None:
+            _ReduceTestCaseGroup(m_SuiteDict, m_TraceStore, m_LastKey[0], m_LastLine, m_Attempts)
+    return SummaryTestResult(m_SuiteDict, m_TraceStore)
+
+
+def LoadTestResult(p_InputFileOrDirectory, p_MemoryBudget=None, p_SpillDirectory=None):
+    """
+    读取测试结果并合成为TestResult，指定了内存预算(字节数)时使用外存模式
+    """
+    m_InputDirectory = GetInputDirectory(p_InputFileOrDirectory)
+    if p_MemoryBudget is None:
+        return BuildTestResult(IterTestResultList(p_InputFileOrDirectory), m_InputDirectory)
+    return BuildTestResultExternal(IterTestResultList(p_InputFileOrDirectory), m_InputDirectory,
+                                   p_MemoryBudget, p_SpillDirectory)
+
 
-    # 合成Report
+def DetectDurationRegression(p_TestResult, p_BaselineResult, p_AbsThreshold, p_RelThreshold):
+    """
+    以(SuiteName, CaseName)为键，把本次运行和基线运行做Hash Join
+    运行时长的增长同时超过绝对阈值(秒)和相对阈值(比例)的Case被认为是发生了性能回退
+    """
+    # 基线结果建立Hash索引
+    m_BaselineIndex = {}
+    for m_TestSuite in p_BaselineResult.TestSuites:
+        for m_TestCase in m_TestSuite.TestCases:
+            m_BaselineIndex[(m_TestSuite.getSuiteName(), m_TestCase.getCaseName())] = \
+                int(m_TestCase.getCaseElapsedTime())
+
+    m_RegressionList = []
+    for m_TestSuite in p_TestResult.TestSuites:
+        for m_TestCase in m_TestSuite.TestCases:
+            m_Key = (m_TestSuite.getSuiteName(), m_TestCase.getCaseName())
+            if m_Key not in m_BaselineIndex:
+                continue
+            m_BaselineElapsedTime = m_BaselineIndex[m_Key]
+            m_CurrentElapsedTime = int(m_TestCase.getCaseElapsedTime())
+            m_Delta = m_CurrentElapsedTime - m_BaselineElapsedTime
+            if m_Delta <= p_AbsThreshold:
+                continue
+            if m_BaselineElapsedTime > 0 and m_Delta <= m_BaselineElapsedTime * p_RelThreshold:
+                continue
+            m_Regression = DurationRegression()
+            m_Regression.SuiteName = m_TestSuite.getSuiteName()
+            m_Regression.CaseName = m_TestCase.getCaseName()
+            m_Regression.CaseOwner = m_TestCase.getCaseOwner()
+            m_Regression.BaselineElapsedTime = m_BaselineElapsedTime
+            m_Regression.CurrentElapsedTime = m_CurrentElapsedTime
+            m_RegressionList.append(m_Regression)
+    p_TestResult.setDurationRegressions(m_RegressionList)
+    return m_RegressionList
+
+
+def DiffTestResult(p_TestResult, p_PreviousResult):
+    """
+    以(SuiteName, CaseName)为键，对本次运行和上次运行做线性时间的比较
+    """
+    m_PreviousIndex = {}
+    for m_TestSuite in p_PreviousResult.TestSuites:
+        for m_TestCase in m_TestSuite.TestCases:
+            m_PreviousIndex[(m_TestSuite.getSuiteName(), m_TestCase.getCaseName())] = m_TestCase
+
+    m_RunDiff = RunDiff()
+    for m_TestSuite in p_TestResult.TestSuites:
+        for m_TestCase in m_TestSuite.TestCases:
+            m_PreviousCase = m_PreviousIndex.pop((m_TestSuite.getSuiteName(), m_TestCase.getCaseName()), None)
+            m_Item = (m_PreviousCase, m_TestCase, m_TestSuite.getSuiteName())
+            if m_PreviousCase is None:
+                m_RunDiff.AddedCases.append(m_Item)
+                continue
+            m_WasPassed = m_PreviousCase.getCaseStatus() == TestCaseStatus.SUCCESS
+            m_IsPassed = m_TestCase.getCaseStatus() == TestCaseStatus.SUCCESS
+            if m_WasPassed and not m_IsPassed:
+                m_RunDiff.NewFailures.append(m_Item)
+            elif not m_WasPassed and m_IsPassed:
+                m_RunDiff.NewPasses.append(m_Item)
+            elif not m_WasPassed and not m_IsPassed:
+                m_RunDiff.StillFailing.append(m_Item)
+    # 索引中剩下的就是本次运行中消失的Case
+    for (m_SuiteName, m_CaseName), m_PreviousCase in m_PreviousIndex.items():
+        m_RunDiff.MissingCases.append((m_PreviousCase, None, m_SuiteName))
+    p_TestResult.setRunDiff(m_RunDiff)
+    return m_RunDiff
+
+
+# 报告中Suite和Case的排序方式，每种方式对应 (Suite的排序键, Case的排序键)，键小的排在前面
+SORT_KEYS = {
+    "failures": (lambda x: -(x.getFailedCaseCount() + x.getErrorCaseCount()),
+                 lambda x: int(x.getCaseStatus() == TestCaseStatus.SUCCESS)),
+    "errors": (lambda x: -x.getErrorCaseCount(),
+               lambda x: {TestCaseStatus.ERROR: 0, TestCaseStatus.FAILURE: 1}.get(x.getCaseStatus(), 2)),
+    "duration": (lambda x: -(x.getSuiteElapsedTime() if x.getSuiteWallClockTime() is None
+                             else x.getSuiteWallClockTime()),
+                 lambda x: -int(x.getCaseElapsedTime())),
+    "name": (lambda x: x.getSuiteName(), lambda x: x.getCaseName()),
+    "starttime": (lambda x: x.getSuiteStartTime(), lambda x: x.getCaseStartTime()),
+}
+
+
+def SortTestResult(p_TestResult, p_SortBy):
+    """
+    按照p_SortBy中的排序方式(SORT_KEYS中的名称，前面的优先)对Suite以及每个Suite中的Case排序
+    每一层只排序一次，排序键预先计算，键相同的保持原有的顺序
+    """
+    if len(p_SortBy) == 0:
+        return
+    m_SuiteKeys = [SORT_KEYS[m_SortBy][0] for m_SortBy in p_SortBy]
+    m_CaseKeys = [SORT_KEYS[m_SortBy][1] for m_SortBy in p_SortBy]
+    p_TestResult.TestSuites.sort(key=lambda x: tuple([m_Key(x) for m_Key in m_SuiteKeys]))
+    for m_TestSuite in p_TestResult.TestSuites:
+        m_TestSuite.TestCases.sort(key=lambda x: tuple([m_Key(x) for m_Key in m_CaseKeys]))
+    if p_TestResult.getOwnerStatistics() is not None:
+        # Owner按照第一次出现的顺序排列，顺序变了以后重新统计
+        p_TestResult.setOwnerStatistics(None)
+
+
+def SplitTestResult(p_TestResult, p_SplitBy):
+    """
+    按照Case的Owner(owner)或者Suite(suite)把TestResult拆分为多个TestResult，返回 [(名称, TestResult), ]
+    直接使用已经汇总好的Case，不需要重新读取测试结果，Suite和Case保持原有的顺序
+    """
+    def get_slice_name(p_SuiteName, p_TestCase):
+        if p_SplitBy == "owner":
+            return p_TestCase.getCaseOwner()
+        return p_SuiteName
+
+    # {名称: {SuiteName: {CaseName: TestCase}}}
+    m_SliceDict = {}
+    for m_TestSuite in p_TestResult.TestSuites:
+        for m_TestCase in m_TestSuite.TestCases:
+            m_SliceDict.setdefault(get_slice_name(m_TestSuite.getSuiteName(), m_TestCase), {}).setdefault(
+                m_TestSuite.getSuiteName(), {})[m_TestCase.getCaseName()] = m_TestCase
+
+    m_Slices = []
+    for m_Name, m_SuiteDict in m_SliceDict.items():
+        m_TestResult = SummaryFoldedTestCases(m_SuiteDict)
+        m_TestResult.setTitle(p_TestResult.getTitle() + " - " + m_Name)
+        m_TestResult.setDescription(p_TestResult.getDescription())
+        # 运行时长回退和运行差异也只保留属于这一部分的Case
+        m_TestResult.setDurationRegressions([
+            m_Regression for m_Regression in p_TestResult.getDurationRegressions()
+            if (m_Regression.CaseOwner if p_SplitBy == "owner" else m_Regression.SuiteName) == m_Name])
+        if p_TestResult.getRunDiff() is not None:
+            m_RunDiff = RunDiff()
+            for m_Key in m_RunDiff.__dict__.keys():
+                setattr(m_RunDiff, m_Key, [
+                    m_Item for m_Item in getattr(p_TestResult.getRunDiff(), m_Key)
+                    if get_slice_name(m_Item[2], m_Item[1] or m_Item[0]) == m_Name])
+            m_TestResult.setRunDiff(m_RunDiff)
+        m_Slices.append((m_Name, m_TestResult))
+    return m_Slices
+
+
+class _SuiteAccumulator(object):
+    """
+    一个Suite中合并后的Case以及增量维护的汇总信息，由所在分片的锁保护
+    """
+    def __init__(self, p_SuiteName, p_Sequence):
+        self.SuiteName = p_SuiteName
+        self.Sequence = p_Sequence         # Suite第一次出现的顺序
+        self.CaseDict = {}                 # {CaseName: TestCase}
+        self.Counters = [0, 0, 0, 0]       # [成功, 失败, 错误, 不稳定]
+        self.ElapsedTime = 0
+        self.StartTime = ""
+        self.FirstBadLabel = ""
+        self.Stale = False                 # 最早的开始时间或Label所在的Case被替换，需要重新计算
+        self.Owners = {}                   # {Owner: [Case数, 成功, 失败, 错误]}，顺序和第一次出现的顺序一致
+
+    def _account(self, p_TestCase, p_Sign):
+        # 把一个Case计入(p_Sign=1)或移出(p_Sign=-1)汇总信息
+        m_Index = {TestCaseStatus.SUCCESS: 0, TestCaseStatus.FAILURE: 1,
+                   TestCaseStatus.ERROR: 2}.get(p_TestCase.getCaseStatus())
+        if m_Index is not None:
+            self.Counters[m_Index] = self.Counters[m_Index] + p_Sign
+        if p_TestCase.isFlaky():
+            self.Counters[3] = self.Counters[3] + p_Sign
+        self.ElapsedTime = self.ElapsedTime + p_Sign * int(p_TestCase.getCaseElapsedTime())
+        if p_TestCase.getCaseOwner() not in self.Owners:
+            self.Owners[p_TestCase.getCaseOwner()] = [0, 0, 0, 0]
+        m_Owner = self.Owners[p_TestCase.getCaseOwner()]
+        m_Owner[0] = m_Owner[0] + p_Sign
+        if m_Index is not None:
+            m_Owner[m_Index + 1] = m_Owner[m_Index + 1] + p_Sign
+        if m_Owner[0] == 0:
+            del self.Owners[p_TestCase.getCaseOwner()]
+        if p_Sign > 0:
+            self._update_minimum(p_TestCase)
+        elif p_TestCase.getCaseStartTime() == self.StartTime or \
+                p_TestCase.getCaseFirstBadLabel() == self.FirstBadLabel:
+            self.Stale = True
+
+    def _update_minimum(self, p_TestCase):
+        if self.StartTime == "" or self.StartTime > p_TestCase.getCaseStartTime():
+            self.StartTime = p_TestCase.getCaseStartTime()
+        if self.FirstBadLabel == "" or self.FirstBadLabel > p_TestCase.getCaseFirstBadLabel():
+            self.FirstBadLabel = p_TestCase.getCaseFirstBadLabel()
+
+    def fold(self, p_TestCase):
+        # 和FoldTestCase的规则相同：同一个Case出现多次的，以最新的为准，但保留所有的运行记录
+        m_OldTestCase = self.CaseDict.get(p_TestCase.getCaseName())
+        if m_OldTestCase is not None:
+            if m_OldTestCase.getCaseStartTime() <= p_TestCase.getCaseStartTime():
+                self._account(m_OldTestCase, -1)
+                p_TestCase.mergeAttempts(m_OldTestCase.getAttempts())
+                del self.CaseDict[p_TestCase.getCaseName()]
+            else:
+                # 保留原来的记录，只有不稳定的状态可能变化
+                m_WasFlaky = m_OldTestCase.isFlaky()
+                m_OldTestCase.mergeAttempts(p_TestCase.getAttempts())
+                self.Counters[3] = self.Counters[3] + int(m_OldTestCase.isFlaky()) - int(m_WasFlaky)
+                return
+        self.CaseDict[p_TestCase.getCaseName()] = p_TestCase
+        self._account(p_TestCase, 1)
+
+    def getTestSuite(self):
+        """
+        生成Suite的快照，计数直接使用增量维护的结果
+        """
+        if self.Stale:
+            self.StartTime = ""
+            self.FirstBadLabel = ""
+            for m_TestCase in self.CaseDict.values():
+                self._update_minimum(m_TestCase)
+            self.Stale = False
+        m_TestSuite = TestSuite()
+        m_TestSuite.setSuiteName(self.SuiteName)
+        m_TestSuite.PassedCaseCount, m_TestSuite.FailedCaseCount, \
+            m_TestSuite.ErrorCaseCount, m_TestSuite.FlakyCaseCount = self.Counters
+        m_TestSuite.setSuiteElapsedTime(self.ElapsedTime)
+        m_TestSuite.setSuiteStartTime(self.StartTime)
+        m_TestSuite.setSuiteFirstBadLabel(self.FirstBadLabel)
+        m_TestSuite.SuiteOwnerList = ','.join(self.Owners.keys())
+        m_Intervals = []
+        for m_TestCase in self.CaseDict.values():
+            # 复制一份，之后的合并不会影响正在生成的报告
+            m_TestCase = copy.copy(m_TestCase)
+            m_TestCase.setTID(m_TestSuite.max_tid)
+            m_TestSuite.max_tid = m_TestSuite.max_tid + 1
+            m_StartTime = ParseCaseStartTime(m_TestCase.getCaseStartTime())
+            if m_StartTime is not None:
+                m_Intervals.append((m_StartTime, m_StartTime + int(m_TestCase.getCaseElapsedTime())))
+            m_TestSuite.TestCases.append(m_TestCase)
+        if len(m_Intervals) != 0:
+            m_TestSuite.SuiteIntervals = UnionIntervals(m_Intervals)
+            m_TestSuite.SuiteWallClockTime = sum([m_End - m_Start for m_Start, m_End in m_TestSuite.SuiteIntervals])
+        return m_TestSuite
+
+
+class TestResultCollector(object):
+    """
+    线程安全的增量收集器，供多线程的测试执行器在进程内直接汇报测试结果
+    Suite按名称分到多个分片中，每个分片一把锁，计数、最早开始时间和Owner统计在加入Case时增量维护
+    """
+
+    # 默认的分片数量
+    DEFAULT_SHARD_COUNT = 16
+
+    def __init__(self, p_ShardCount=DEFAULT_SHARD_COUNT):
+        # 每个分片: (锁, {SuiteName: _SuiteAccumulator})，错误堆栈在生成快照时统一保存到TraceStore中
+        import threading
+        self.Shards = [(threading.Lock(), {}) for _ in range(p_ShardCount)]
+        self.SuiteLock = threading.Lock()  # 只在第一次出现一个Suite时用来分配顺序号
+        self.SuiteCount = 0
+
+    def _get_shard(self, p_SuiteName):
+        # 返回Suite所在分片的序号
+        return hash(p_SuiteName) % len(self.Shards)
+
+    def _get_accumulator(self, p_Suites, p_SuiteName):
+        # 调用时已经持有分片的锁
+        m_Accumulator = p_Suites.get(p_SuiteName)
+        if m_Accumulator is None:
+            with self.SuiteLock:
+                m_Accumulator = _SuiteAccumulator(p_SuiteName, self.SuiteCount)
+                self.SuiteCount = self.SuiteCount + 1
+            p_Suites[p_SuiteName] = m_Accumulator
+        return m_Accumulator
+
+    def addTestCases(self, p_TestCases):
+        """
+        批量加入 [(SuiteName, TestCase), ]，每个分片只加一次锁
+        加入后TestCase归收集器所有，调用者不应再修改
+        """
+        m_Batches = {}
+        for m_SuiteName, m_TestCase in p_TestCases:
+            m_Batches.setdefault(self._get_shard(m_SuiteName), []).append((m_SuiteName, m_TestCase))
+        for m_ShardIndex, m_Batch in m_Batches.items():
+            m_Lock, m_Suites = self.Shards[m_ShardIndex]
+            with m_Lock:
+                for m_SuiteName, m_TestCase in m_Batch:
+                    self._get_accumulator(m_Suites, m_SuiteName).fold(m_TestCase)
+
+    def addTestCase(self, p_SuiteName, p_TestCase):
+        self.addTestCases([(p_SuiteName, p_TestCase)])
+
+    def addTestResults(self, p_TestResults, p_InputDirectory=""):
+        """
+        批量加入和json文件相同格式的测试结果记录，在锁外完成解析，返回成功加入的记录数
+        """
+        m_TestCases = []
+        for m_TestResult in p_TestResults:
+            try:
+                m_TestCase = ParseTestCase(m_TestResult, p_InputDirectory)
+                if m_TestCase is None:
+                    continue
+                m_TestCases.append((m_TestResult["SuiteName"], m_TestCase))
+            except (KeyError, AttributeError, TypeError):
+                print("[WARNING] record from [" + str(m_TestResult.get("load_filename")) +
+                      "] is incomplete, ignore it.")
+        self.addTestCases(m_TestCases)
+        return len(m_TestCases)
+
+    def addTestResult(self, p_TestResult, p_InputDirectory=""):
+        return self.addTestResults([p_TestResult], p_InputDirectory) != 0
+
+    def getCaseCounts(self):
+        """
+        返回当前的 (成功, 失败, 错误, 不稳定) 的Case数，不需要生成快照
+        """
+        m_Counters = [0, 0, 0, 0]
+        for m_Lock, m_Suites in self.Shards:
+            with m_Lock:
+                for m_Accumulator in m_Suites.values():
+                    m_Counters = [m_Total + m_Count for m_Total, m_Count in zip(m_Counters, m_Accumulator.Counters)]
+        return tuple(m_Counters)
+
+    def getTestResult(self):
+        """
+        生成当前所有结果的TestResult快照，每个Suite内部是一致的，收集可以同时继续进行
+        """
+        m_Snapshots = []
+        m_TraceStore = TraceStore()
+        for m_Lock, m_Suites in self.Shards:
+            with m_Lock:
+                for m_Accumulator in m_Suites.values():
+                    m_Snapshots.append((m_Accumulator.Sequence, m_Accumulator.getTestSuite(),
+                                        [(m_Owner, list(m_Counter)) for m_Owner, m_Counter in
+                                         m_Accumulator.Owners.items()]))
+        m_Snapshots.sort(key=lambda x: x[0])
+
+        m_TestResult = TestResult()
+        m_TestResult.setTraceStore(m_TraceStore)
+        m_OwnerStatistics = {}
+        for _, m_TestSuite, m_Owners in m_Snapshots:
+            for m_TestCase in m_TestSuite.TestCases:
+                m_TraceStore.intern(m_TestCase)
+            m_TestResult.addSuite(m_TestSuite)
+            for m_Owner, m_Counter in m_Owners:
+                if m_Owner not in m_OwnerStatistics:
+                    m_OwnerStatistics[m_Owner] = [0, 0, 0]
+                m_Total = m_OwnerStatistics[m_Owner]
+                for m_Index in range(3):
+                    m_Total[m_Index] = m_Total[m_Index] + m_Counter[m_Index + 1]
+        m_TestResult.setOwnerStatistics([(m_Owner, m_Counter[0], m_Counter[1], m_Counter[2])
+                                         for m_Owner, m_Counter in m_OwnerStatistics.items()])
+        return m_TestResult
+
+
+class LiveReportCollector(object):
+    """
+    在本地socket上接收多个测试进程发送的测试结果(每行一条和json文件相同格式的记录)，
+    合并到内存中的Suite模型，并定期刷新报告
+    """
+
+    # 一条记录的最大长度
+    MAX_RECORD_SIZE = 16 * 1024 * 1024
+
+    def __init__(self, p_Runner, p_Output, p_Title, p_Description, p_FlushInterval,
+                 p_JUnitXML=None, p_JsonSummary=None, p_Metrics=None, p_SortBy=()):
+        self.Runner = p_Runner
+        self.Output = p_Output
+        self.Title = p_Title
+        self.Description = p_Description
+        self.FlushInterval = p_FlushInterval
+        self.JUnitXML = p_JUnitXML
+        self.JsonSummary = p_JsonSummary
+        self.Metrics = p_Metrics
+        self.SortBy = p_SortBy
+        self.Collector = TestResultCollector()
+        self.Changed = False               # 上次刷新后是否收到了新的记录
+
+    def addTestResult(self, p_TestResult):
+        if self.Collector.addTestResult(p_TestResult):
+            self.Changed = True
+
+    def getTestResult(self):
+        m_TestResult = self.Collector.getTestResult()
+        SortTestResult(m_TestResult, self.SortBy)
+        m_TestResult.setTitle(self.Title)
+        m_TestResult.setDescription(self.Description)
+        return m_TestResult
+
+    def writeReport(self, p_TestResult):
+        m_PhaseStartTime = perf_counter()
+        self.Runner.generateReport(result=p_TestResult, p_output=self.Output)
+        p_TestResult.addPhaseTiming("render", perf_counter() - m_PhaseStartTime)
+        if self.JUnitXML:
+            self.Runner.generateJUnitXML(result=p_TestResult, p_output=self.JUnitXML)
+        if self.JsonSummary:
+            self.Runner.generateJsonSummary(result=p_TestResult, p_output=self.JsonSummary)
+        if self.Metrics:
+            self.Runner.generateMetrics(result=p_TestResult, p_output=self.Metrics)
+
+    def flush(self):
+        self.Changed = False
+        self.writeReport(self.getTestResult())
+
+    async def _handle_connection(self, p_Reader, p_Writer):
+        m_Peer = str(p_Writer.get_extra_info("peername") or "socket")
+        while True:
+            try:
+                m_Line = await p_Reader.readline()
+            except (ValueError, ConnectionError) as m_Error:
+                print("[WARNING] connection [" + m_Peer + "] aborted: " + repr(m_Error))
+                break
+            if not m_Line:
+                break
+            if not m_Line.strip():
+                continue
+            try:
+                m_TestResult = json.loads(m_Line)
+            except JSONDecodeError:
+                print("[WARNING] connection [" + m_Peer + "] sent a bad json record, ignore it.")
+                continue
+            if not isinstance(m_TestResult, dict):
+                continue
+            m_TestResult["load_filename"] = m_Peer
+            self.addTestResult(m_TestResult)
+        p_Writer.close()
+
+    async def _flush_loop(self):
+        import asyncio
+        m_Loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.FlushInterval)
+            if not self.Changed:
+                continue
+            # 在线程中生成快照和报告，生成报告期间可以继续接收记录
+            self.Changed = False
+            await m_Loop.run_in_executor(None, lambda: self.writeReport(self.getTestResult()))
+
+    async def _serve(self, p_Address):
+        import asyncio
+        import signal
+        if p_Address.startswith("unix:"):
+            m_Server = await asyncio.start_unix_server(
+                self._handle_connection, path=p_Address[len("unix:"):], limit=self.MAX_RECORD_SIZE)
+        else:
+            m_Host, _, m_Port = p_Address.rpartition(":")
+            m_Server = await asyncio.start_server(
+                self._handle_connection, m_Host or "127.0.0.1", int(m_Port), limit=self.MAX_RECORD_SIZE)
+        m_StopEvent = asyncio.Event()
+        for m_Signal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(m_Signal, m_StopEvent.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows下不支持，依赖KeyboardInterrupt结束
+                pass
+        m_FlushTask = asyncio.ensure_future(self._flush_loop())
+        try:
+            async with m_Server:
+                await m_StopEvent.wait()
+        finally:
+            m_FlushTask.cancel()
+
+    def serve(self, p_Address):
+        """
+        开始接收测试结果，收到SIGINT/SIGTERM后写出最终的报告并退出
+        """
+        import asyncio
+        try:
+            asyncio.run(self._serve(p_Address))
+        except KeyboardInterrupt:
+            pass
+        self.flush()
+
+
+def PrintVersion(p_Context, p_Parameter, p_Value):
+    # 在检查其他参数之前处理，只显示版本时不需要指定--output
+    if not p_Value or p_Context.resilient_parsing:
+        return
+    print("Version:", __version__)
+    p_Context.exit()
+
+
+@click.command()
+@click.option("--version", is_flag=True, is_eager=True, expose_value=False, callback=PrintVersion,
+              help="Display HtmlTestReport version.")
+@click.option("--title", type=str, help="Report title")
+@click.option("--datadir", type=str,
+              help="Test result directory name or file name, json, jsonl or JUnit XML. "
+                   "XML files written by --junit-xml are skipped when reading a directory.")
+@click.option("--output", type=str, required=True, help="Output Html Report.")
+@click.option("--descfile", type=str, help="Test description")
+@click.option("--baseline", type=str, help="Baseline test result directory name or file name.")
+@click.option("--regress-abs", "regress_abs", type=int, default=10, show_default=True,
+              help="Absolute elapsed time growth (seconds) to flag a duration regression.")
+@click.option("--regress-rel", "regress_rel", type=float, default=0.5, show_default=True,
+              help="Relative elapsed time growth (ratio) to flag a duration regression.")
+@click.option("--search/--no-search", "search", default=True, show_default=True,
+              help="Embed a prebuilt search index and search box in the report.")
+@click.option("--static-charts", "static_charts", is_flag=True,
+              help="Embed static SVG charts shown until echarts is loaded.")
+@click.option("--workers", type=int, default=1, show_default=True,
+              help="Number of processes used to render suite blocks.")
+@click.option("--gzip", "gzip_level", type=click.IntRange(1, 9),
+              help="Also write pre-compressed .gz files of the report and assets with this level.")
+@click.option("--junit-xml", "junit_xml", type=str, help="Also write a JUnit XML file.")
+@click.option("--json-summary", "json_summary", type=str, help="Also write a JSON summary file.")
+@click.option("--metrics", type=str, help="Also write an OpenMetrics textfile with run statistics.")
+@click.option("--chart-top-k", "chart_top_k", type=int, default=HTMLTestRunner.DEFAULT_CHART_TOP_K,
+              show_default=True, help="Maximum number of categories in the owner chart, the rest is merged.")
+@click.option("--chart-sort-by", "chart_sort_by", type=click.Choice(["failures", "errors", "total"]),
+              default="total", show_default=True, help="How to select the top categories in the owner chart.")
+@click.option("--chart-group-by", "chart_group_by", type=click.Choice(["owner", "suite-owner", "team"]),
+              default="owner", show_default=True, help="Category of the owner chart.")
+@click.option("--team-map", "team_map", type=str,
+              help="Json file mapping case owner to team, used with --chart-group-by team.")
+@click.option("--sort-by", "sort_by", type=str, default="",
+              help="Comma separated order of suites and cases: " + ", ".join(SORT_KEYS.keys()) +
+                   ". Earlier keys take precedence, ties keep the input order.")
+@click.option("--split-by", "split_by", type=click.Choice(["owner", "suite"]),
+              help="Also write one report per case owner or suite next to --output, plus an index page.")
+@click.option("--row-budget", "row_budget", type=int,
+              help="Maximum number of case rows, passing cases beyond it are merged into one row per suite.")
+@click.option("--keep-slowest", "keep_slowest", type=int, default=HTMLTestRunner.DEFAULT_KEEP_SLOWEST,
+              show_default=True, help="Number of slowest passing cases still shown when --row-budget is exceeded.")
+@click.option("--elided-sidecar", "elided_sidecar", is_flag=True,
+              help="Write the cases merged by --row-budget to a compressed jsonl file next to the report.")
+@click.option("--memory-budget", "memory_budget", type=int,
+              help="Memory budget (MB) for loading test results, spill to disk when exceeded.")
+@click.option("--spill-dir", "spill_dir", type=str, help="Directory for spilled temporary files.")
+@click.option("--collect", type=str,
+              help="Collect results from a local socket (unix:PATH or [HOST:]PORT) instead of --datadir.")
+@click.option("--flush-interval", "flush_interval", type=float, default=10, show_default=True,
+              help="Seconds between report refreshes in --collect mode.")
+@click.option("--diff", type=str,
+              help="Previous test result directory name or file name, generate a run-to-run diff report.")
+def GenerateHtmlTestReport(
+        datadir,
+        output,
+        title,
+        descfile,
+        baseline,
+        regress_abs,
+        regress_rel,
+        search,
+        static_charts,
+        workers,
+        gzip_level,
+        junit_xml,
+        json_summary,
+        metrics,
+        chart_top_k,
+        chart_sort_by,
+        chart_group_by,
+        team_map,
+        sort_by,
+        split_by,
+        row_budget,
+        keep_slowest,
+        elided_sidecar,
+        memory_budget,
+        spill_dir,
+        collect,
+        flush_interval,
+        diff
+):
+    if datadir is None and collect is None:
+        raise click.UsageError("Missing option '--datadir' (or '--collect').")
+    if collect:
+        # 收集模式下的报告由收集器定期生成，不支持以下选项，直接报错而不是静默的忽略
+        for m_OptionName, m_OptionValue in [("--datadir", datadir), ("--baseline", baseline), ("--diff", diff),
+                                            ("--split-by", split_by), ("--memory-budget", memory_budget),
+                                            ("--spill-dir", spill_dir)]:
+            if m_OptionValue is not None:
+                raise click.UsageError("Option '" + m_OptionName + "' can not be used with '--collect'.")
+    m_SortBy = [m_SortKey.strip() for m_SortKey in sort_by.split(",") if m_SortKey.strip() != ""]
+    for m_SortKey in m_SortBy:
+        if m_SortKey not in SORT_KEYS:
+            raise click.BadParameter("unknown sort key [" + m_SortKey + "], choose from " +
+                                     ", ".join(SORT_KEYS.keys()) + ".", param_hint="'--sort-by'")
+
+    # 报告的标题和描述信息
     if title:
         m_ReportTitle = title
     else:
         m_ReportTitle = "未知测试报告"
-    m_TestResult = TestResult()
-    m_TestResult.setTitle(m_ReportTitle)
     if descfile is None:
         m_Description = "无描述信息"
     else:
@@ -1213,22 +3498,77 @@ def GenerateHtmlTestReport(
                 m_Description = '<br>'.join(f.readlines())
         else:
             m_Description = "无描述信息"
+
+    m_OutputFileName = output
+    m_TeamMap = None
+    if team_map:
+        with open(team_map, 'r', encoding="utf-8") as f:
+            m_TeamMap = json.load(f)
+    m_HTMLTestRunner = HTMLTestRunner(search_index=search, static_charts=static_charts, workers=workers,
+                                      gzip_level=gzip_level, chart_top_k=chart_top_k, chart_sort_by=chart_sort_by,
+                                      chart_group_by=chart_group_by, team_map=m_TeamMap, row_budget=row_budget,
+                                      keep_slowest=keep_slowest, elided_sidecar=elided_sidecar)
+
+    # 在socket上接收测试结果，定期刷新报告
+    if collect:
+        m_Collector = LiveReportCollector(m_HTMLTestRunner, m_OutputFileName, m_ReportTitle, m_Description,
+                                          flush_interval, junit_xml, json_summary, metrics, m_SortBy)
+        m_Collector.serve(collect)
+        return
+
+    if memory_budget is None:
+        m_MemoryBudget = None
+    else:
+        m_MemoryBudget = memory_budget * 1024 * 1024
+    m_PhaseStartTime = perf_counter()
+    m_TestResult = LoadTestResult(datadir, m_MemoryBudget, spill_dir)
+    m_TestResult.addPhaseTiming("load", perf_counter() - m_PhaseStartTime)
+    # 先排序，之后生成的报告、差异和图表都按照这个顺序
+    SortTestResult(m_TestResult, m_SortBy)
+
+    # 合成Report
+    m_TestResult.setTitle(m_ReportTitle)
     m_TestResult.setDescription(m_Description)
-    for m_TestSuite in m_SuiteDict.values():
-        # 记录Case的汇总信息
-        m_TestSuite.SummaryTestCase()
-        m_TestResult.addSuite(m_TestSuite)
+
+    # 和基线结果比较运行时长
+    if baseline:
+        m_PhaseStartTime = perf_counter()
+        m_BaselineResult = LoadTestResult(baseline, m_MemoryBudget, spill_dir)
+        DetectDurationRegression(m_TestResult, m_BaselineResult, regress_abs, regress_rel)
+        m_TestResult.addPhaseTiming("baseline", perf_counter() - m_PhaseStartTime)
+
+    # 和上次运行结果比较，只生成差异报告
+    if diff:
+        m_PhaseStartTime = perf_counter()
+        m_PreviousResult = LoadTestResult(diff, m_MemoryBudget, spill_dir)
+        DiffTestResult(m_TestResult, m_PreviousResult)
+        m_TestResult.addPhaseTiming("diff", perf_counter() - m_PhaseStartTime)
 
     # 生成测试报告
-    m_OutputFileName = output
-    m_HTMLTestRunner = HTMLTestRunner()
+    m_PhaseStartTime = perf_counter()
     m_HTMLTestRunner.generateReport(result=m_TestResult, p_output=m_OutputFileName)
+    m_TestResult.addPhaseTiming("render", perf_counter() - m_PhaseStartTime)
+    if split_by:
+        m_PhaseStartTime = perf_counter()
+        m_HTMLTestRunner.generateSplitReports(result=m_TestResult, p_output=m_OutputFileName, p_SplitBy=split_by)
+        m_TestResult.addPhaseTiming("split", perf_counter() - m_PhaseStartTime)
+    if junit_xml:
+        m_PhaseStartTime = perf_counter()
+        m_HTMLTestRunner.generateJUnitXML(result=m_TestResult, p_output=junit_xml)
+        m_TestResult.addPhaseTiming("junit_xml", perf_counter() - m_PhaseStartTime)
+    if json_summary:
+        m_PhaseStartTime = perf_counter()
+        m_HTMLTestRunner.generateJsonSummary(result=m_TestResult, p_output=json_summary)
+        m_TestResult.addPhaseTiming("json_summary", perf_counter() - m_PhaseStartTime)
+    if metrics:
+        m_HTMLTestRunner.generateMetrics(result=m_TestResult, p_output=metrics)
 
 
 if __name__ == "__main__":
     try:
         GenerateHtmlTestReport()
     except Exception as ge:
+        import traceback
         print('traceback.print_exc():\n%s' % traceback.print_exc())
         print('traceback.format_exc():\n%s' % traceback.format_exc())
         print("Fatal Exception: " + repr(ge))
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+用 python -X importtime 测量HtmlTestReport的启动时间，并检查是否超出预算
+
+    python -m HtmlTestReport.startup_benchmark --budget-ms 100
+
+超出预算，或者应该延迟导入的模块在启动时被导入，返回码为1
+"""
+import os
+import sys
+import subprocess
+import click
+from time import perf_counter
+
+# 启动时不应该被导入的模块，只在用到的函数中导入
+LAZY_MODULES = [
+    "asyncio",
+    "signal",
+    "concurrent.futures",
+    "xml.sax",
+    "xml.etree.ElementTree",
+    "gzip",
+    "tempfile",
+    "shutil",
+    "filecmp",
+    "traceback",
+]
+
+# 默认的启动时间预算(毫秒)，是导入HtmlTestReport.main的累计时间
+DEFAULT_BUDGET_MS = 100
+
+
+def ParseImportTime(p_Output):
+    """
+    解析 -X importtime 的输出，返回 {模块名: (自身耗时, 累计耗时)}，单位是微秒
+    """
+    m_ImportTimes = {}
+    for m_Line in p_Output.splitlines():
+        if not m_Line.startswith("import time:"):
+            continue
+        m_Fields = m_Line[len("import time:"):].split("|")
+        if len(m_Fields) != 3 or not m_Fields[0].strip().isdigit():
+            # 跳过表头
+            continue
+        m_ImportTimes[m_Fields[2].strip()] = (int(m_Fields[0]), int(m_Fields[1]))
+    return m_ImportTimes
+
+
+def MeasureImportTime(p_Module, p_WriteBytecode=False):
+    m_Environment = None
+    if p_WriteBytecode:
+        # 安装后的包都有字节码缓存，测量前先生成，否则测到的主要是编译的时间
+        m_Environment = dict(os.environ)
+        m_Environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    m_Process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + p_Module],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True,
+                               env=m_Environment)
+    return ParseImportTime(m_Process.stderr)
+
+
+def MeasureCommandTime(p_Arguments):
+    m_StartTime = perf_counter()
+    subprocess.run([sys.executable] + p_Arguments, stdout=subprocess.DEVNULL, check=True)
+    return perf_counter() - m_StartTime
+
+
+def GetEagerModules(p_Module):
+    """
+    返回导入p_Module后已经被导入的LAZY_MODULES
+    """
+    m_Process = subprocess.run(
+        [sys.executable, "-c", "import sys, " + p_Module + "; print('\\n'.join(sorted(sys.modules)))"],
+        stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    m_Modules = set(m_Process.stdout.split())
+    return [m_Module for m_Module in LAZY_MODULES if m_Module in m_Modules]
+
+
+@click.command()
+@click.option("--module", type=str, default="HtmlTestReport.main", show_default=True, help="Module to import.")
+@click.option("--runs", type=int, default=5, show_default=True, help="Number of measured runs, the median is used.")
+@click.option("--budget-ms", "budget_ms", type=float, default=DEFAULT_BUDGET_MS, show_default=True,
+              help="Maximum cumulative import time of the module in milliseconds.")
+@click.option("--top", type=int, default=10, show_default=True, help="Number of slowest imports to show.")
+def StartupBenchmark(module, runs, budget_ms, top):
+    # 第一次运行生成字节码缓存，不计入结果
+    MeasureImportTime(module, True)
+    m_Results = [MeasureImportTime(module) for _ in range(runs)]
+    m_Results.sort(key=lambda x: x[module][1])
+    m_Median = m_Results[len(m_Results) // 2]
+    m_ImportTime = m_Median[module][1] / 1000
+
+    print("Slowest imports (cumulative ms):")
+    for m_Name, (m_Self, m_Cumulative) in sorted(m_Median.items(), key=lambda x: -x[1][1])[:top]:
+        print("  %8.1f  %8.1f  %s" % (m_Cumulative / 1000, m_Self / 1000, m_Name))
+    m_VersionTimes = sorted([MeasureCommandTime(["-m", module, "--version"]) for _ in range(runs)])
+    print("import %s: %.1f ms (budget %.1f ms)" % (module, m_ImportTime, budget_ms))
+    print("%s --version: %.1f ms" % (module, m_VersionTimes[len(m_VersionTimes) // 2] * 1000))
+
+    m_Failed = False
+    if m_ImportTime > budget_ms:
+        print("[ERROR] import time is over budget.")
+        m_Failed = True
+    m_EagerModules = GetEagerModules(module)
+    if len(m_EagerModules) != 0:
+        print("[ERROR] modules imported at startup but expected to be lazy: " + ", ".join(m_EagerModules))
+        m_Failed = True
+    sys.exit(1 if m_Failed else 0)
+
+
+if __name__ == "__main__":
+    StartupBenchmark()